@@ -3,17 +3,59 @@ MedIntel AI - Health Intelligence Platform
 Backend API Server with Intelligent Scraping Engine
 """
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response, stream_with_context, g, url_for, abort
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from lxml import etree
 import re
 import time
+import threading
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+import heapq
+from bisect import bisect_left
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import defaultdict, OrderedDict, deque
+import codecs
+import io
 import json
 import logging
-from urllib.parse import quote_plus
+from urllib.parse import quote_plus, urlparse
 import hashlib
+import os
+import socket
+import ssl
+import sqlite3
+import sys
+import mmap
+import pickle
+import zlib
+import math
+import gzip
+import struct
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # Optional: only used to vectorize scoring on large knowledge bases
+    np = None
+
+try:
+    import yaml
+except ImportError:  # Optional: only needed for YAML knowledge base files
+    yaml = None
+
+try:
+    import orjson
+except ImportError:  # Optional: faster response encoding; falls back to json
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Optional: adds brotli variants of static assets; gzip is always built
+    brotli = None
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -27,141 +69,1089 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # ==================== CACHING LAYER ====================
-query_cache = {}
-scrape_cache = {}
 CACHE_DURATION = timedelta(hours=6)
+CACHE_SWEEP_INTERVAL = 60  # Seconds between background expiry sweeps
+
+def estimate_size(value):
+    """Approximate the memory footprint of a JSON-like cache value in bytes"""
+    return len(json.dumps(value, default=str))
+
+class TTLCache:
+    """Thread-safe LRU cache with TTL expiry and entry/byte budgets
+
+    Expired entries are dropped on read and by a background sweeper thread,
+    so idle keys don't accumulate between lookups. With a stale_ttl, entries
+    outlive their TTL by that grace period and can still be read through
+    lookup() (flagged as stale) while a fresh value is fetched.
+    """
+
+    def __init__(self, name, ttl=CACHE_DURATION, max_entries=None, max_bytes=None,
+                 sweep_interval=CACHE_SWEEP_INTERVAL, sizeof=estimate_size, stale_ttl=0):
+        self.name = name
+        self.ttl = ttl.total_seconds() if isinstance(ttl, timedelta) else ttl
+        self.stale_ttl = stale_ttl.total_seconds() if isinstance(stale_ttl, timedelta) else stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data = OrderedDict()  # key -> (expires_at, size, value, fresh_until), oldest first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if sweep_interval:
+            self._sweeper = threading.Thread(
+                target=self._sweep_loop, args=(sweep_interval,),
+                name=f'{name}-sweeper', daemon=True
+            )
+            self._sweeper.start()
+
+    def get(self, key, default=None):
+        """Return the live value for key, refreshing its LRU position"""
+        value, fresh = self.lookup(key, allow_stale=False)
+        return value if fresh else default
+
+    def lookup(self, key, allow_stale=True):
+        """Return (value, fresh); stale values inside the grace period come back with fresh=False"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] <= now:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None or (entry[3] <= now and not allow_stale):
+                self.misses += 1
+                return None, False
+            self._data.move_to_end(key)
+            if entry[3] <= now:
+                self.stale_hits += 1
+                return entry[2], False
+            self.hits += 1
+            return entry[2], True
+
+    def ttl_remaining(self, key):
+        """Seconds until key goes stale (negative once stale), or None if absent"""
+        entry = self._data.get(key)
+        return None if entry is None else entry[3] - time.monotonic()
+
+    def set(self, key, value, ttl=None):
+        """Store value under key, evicting least recently used entries to fit"""
+        size = self.sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            logger.warning(f"{self.name}: value of {size} bytes exceeds cache budget, not cached")
+            return
+        fresh_until = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (fresh_until + self.stale_ttl, size, value, fresh_until)
+            self._bytes += size
+            while ((self.max_entries and len(self._data) > self.max_entries) or
+                   (self.max_bytes and self._bytes > self.max_bytes)):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        size = self._data.pop(key)[1]
+        self._bytes -= size
+
+    def sweep(self):
+        """Drop every expired entry and return how many were removed"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._data.items() if entry[0] <= now]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def _sweep_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                removed = self.sweep()
+                if removed:
+                    logger.info(f"{self.name}: swept {removed} expired entries")
+            except Exception as e:
+                logger.error(f"{self.name}: sweep failed: {str(e)}")
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Counters for the /health endpoint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+# Two-level analysis cache: normalized_cache memoizes sanitized text -> canonical
+# symptoms, and query_cache holds responses keyed on that canonical form, so
+# "fever and cough" and "Cough, fever" share one entry
+normalized_cache = TTLCache('normalized_cache', max_entries=50000, max_bytes=16 * 1024 * 1024)
+query_cache = TTLCache('query_cache', max_entries=10000, max_bytes=64 * 1024 * 1024,
+                       sizeof=lambda encoded: encoded.size)  # Holds EncodedResponse objects
+# Scrape results stay servable for a grace period past CACHE_DURATION while they're refreshed
+STALE_WHILE_REVALIDATE = timedelta(hours=1)
+scrape_cache = TTLCache('scrape_cache', max_entries=5000, max_bytes=32 * 1024 * 1024,
+                        stale_ttl=STALE_WHILE_REVALIDATE)
+
+# ==================== SHARED CACHE BACKENDS ====================
+class CacheBackend:
+    """Out-of-process cache shared by every worker, with per-key fetch locks
+
+    Subclasses implement the underscored primitives; the public wrappers
+    treat backend failures as cache misses so an outage never fails a request.
+    """
+
+    name = 'backend'
+
+    def get(self, key):
+        try:
+            raw = self._get(key)
+            return None if raw is None else json.loads(raw)
+        except Exception as e:
+            logger.warning(f"{self.name} cache get failed: {str(e)}")
+            return None
+
+    def set(self, key, value, ttl):
+        try:
+            self._set(key, json.dumps(value).encode(), ttl)
+        except Exception as e:
+            logger.warning(f"{self.name} cache set failed: {str(e)}")
+
+    def acquire_lock(self, key, ttl):
+        """Try to become the single fetcher for key; returns a token or None"""
+        token = os.urandom(8).hex()
+        try:
+            return token if self._acquire(key, token, ttl) else None
+        except Exception as e:
+            # Without a working lock, fetching locally beats not fetching at all
+            logger.warning(f"{self.name} lock acquire failed: {str(e)}")
+            return token
+
+    def release_lock(self, key, token):
+        try:
+            self._release(key, token)
+        except Exception as e:
+            logger.warning(f"{self.name} lock release failed: {str(e)}")
+
+    def incr(self, key, ttl, amount=1):
+        """Add amount to a counter that expires ttl seconds after creation; None on failure"""
+        try:
+            return self._incr(key, ttl, amount)
+        except Exception as e:
+            logger.warning(f"{self.name} counter incr failed: {str(e)}")
+            return None
+
+    def get_counter(self, key):
+        """Current value of a counter (0 if absent); None on failure"""
+        try:
+            return self._get_counter(key)
+        except Exception as e:
+            logger.warning(f"{self.name} counter get failed: {str(e)}")
+            return None
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, raw, ttl):
+        raise NotImplementedError
+
+    def _acquire(self, key, token, ttl):
+        raise NotImplementedError
+
+    def _release(self, key, token):
+        raise NotImplementedError
+
+    def _incr(self, key, ttl, amount):
+        raise NotImplementedError
+
+    def _get_counter(self, key):
+        raise NotImplementedError
+
+class SQLiteCacheBackend(CacheBackend):
+    """Cache in a local SQLite file, shared by the worker processes on one host"""
+
+    name = 'sqlite'
+    PURGE_EVERY = 100  # Expired rows are purged every N writes
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache '
+            '(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS locks '
+            '(key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS counters '
+            '(key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL)'
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key):
+        row = self._conn().execute(
+            'SELECT value FROM cache WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key, raw, ttl):
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, raw, time.time() + ttl)
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute('DELETE FROM cache WHERE expires_at <= ?', (time.time(),))
+
+    def _acquire(self, key, token, ttl):
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM locks WHERE key = ? AND expires_at <= ?', (key, now))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO locks (key, token, expires_at) VALUES (?, ?, ?)',
+                (key, token, now + ttl)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return cursor.rowcount == 1
+
+    def _release(self, key, token):
+        self._conn().execute('DELETE FROM locks WHERE key = ? AND token = ?', (key, token))
+
+    def _incr(self, key, ttl, amount):
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM counters WHERE key = ? AND expires_at <= ?', (key, now))
+            conn.execute(
+                'INSERT INTO counters (key, value, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = value + excluded.value',
+                (key, amount, now + ttl)
+            )
+            value = conn.execute('SELECT value FROM counters WHERE key = ?', (key,)).fetchone()[0]
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute('DELETE FROM counters WHERE expires_at <= ?', (now,))
+        return value
+
+    def _get_counter(self, key):
+        row = self._conn().execute(
+            'SELECT value FROM counters WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+class RedisCacheBackend(CacheBackend):
+    """Cache on any server speaking the Redis protocol (RESP2), shared across hosts
+
+    rediss:// URLs connect over TLS, verified against the system CA store
+    unless an ssl_context is given.
+    """
+
+    name = 'redis'
+    RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(self, url, socket_timeout=2, ssl_context=None):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.socket_timeout = socket_timeout
+        self.ssl_context = None
+        if parsed.scheme == 'rediss':
+            self.ssl_context = ssl_context or ssl.create_default_context()
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.socket_timeout)
+        if self.ssl_context is not None:
+            # Before AUTH, so the password never crosses the network in cleartext
+            try:
+                sock = self.ssl_context.wrap_socket(sock, server_hostname=self.host)
+            except Exception:
+                sock.close()
+                raise
+        self._local.sock = sock
+        self._local.reader = sock.makefile('rb')
+        if self.password:
+            self._send('AUTH', self.password)
+        if self.db:
+            self._send('SELECT', self.db)
+
+    def execute(self, *args):
+        """Send one command, reconnecting once if the pooled socket went stale"""
+        for attempt in (0, 1):
+            if getattr(self._local, 'sock', None) is None:
+                self._connect()
+            try:
+                return self._send(*args)
+            except (OSError, EOFError):
+                self._local.sock.close()
+                self._local.sock = None
+                if attempt:
+                    raise
+
+    def _send(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self._local.sock.sendall(b''.join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self._local.reader.readline()
+        if not line:
+            raise EOFError('connection closed by server')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload
+        if kind == b'-':
+            raise RuntimeError(payload.decode(errors='replace'))
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._local.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            count = int(payload)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise RuntimeError(f'unexpected reply: {line!r}')
+
+    def _get(self, key):
+        return self.execute('GET', key)
+
+    def _set(self, key, raw, ttl):
+        self.execute('SET', key, raw, 'PX', int(ttl * 1000))
+
+    def _acquire(self, key, token, ttl):
+        return self.execute('SET', f'lock:{key}', token, 'NX', 'PX', int(ttl * 1000)) is not None
+
+    def _release(self, key, token):
+        self.execute('EVAL', self.RELEASE_SCRIPT, 1, f'lock:{key}', token)
+
+    def _incr(self, key, ttl, amount):
+        value = self.execute('INCRBY', key, amount)
+        if value == amount:
+            self.execute('PEXPIRE', key, int(ttl * 1000))
+        return value
+
+    def _get_counter(self, key):
+        value = self.execute('GET', key)
+        return int(value) if value is not None else 0
+
+def create_cache_backend(url):
+    """Build a shared backend from a sqlite:///path or redis[s]://host:port/db URL"""
+    if not url:
+        return None
+    scheme = urlparse(url).scheme
+    if scheme == 'sqlite':
+        return SQLiteCacheBackend(url[len('sqlite:///'):] or 'medintel-cache.db')
+    if scheme in ('redis', 'rediss'):
+        return RedisCacheBackend(url)
+    raise ValueError(f"Unsupported cache backend URL: {url}")
+
+# e.g. sqlite:////var/cache/medintel.db or redis://cache.internal:6379/0
+shared_cache = create_cache_backend(os.environ.get('MEDINTEL_SHARED_CACHE_URL'))
+SHARED_LOCK_TTL = 15  # Seconds a worker may hold a scrape lock before others take over
+SHARED_POLL_INTERVAL = 0.05
+
+# ==================== PERSISTENT DISK CACHE ====================
+DISK_CACHE_COMPACT_EVERY = 500  # Writes between expired-row purges
+
+class DiskCache:
+    """Compressed SQLite tier under the in-memory scrape cache that survives restarts
+
+    Nothing is preloaded: entries are read lazily on in-memory misses and
+    promoted with their remaining TTL. Rows are kept through the stale grace
+    period so stale-while-revalidate keeps working across deploys, and are
+    purged (with incremental vacuuming) every DISK_CACHE_COMPACT_EVERY writes.
+    """
+
+    def __init__(self, path, stale_ttl=0):
+        self.path = path
+        self.stale_ttl = stale_ttl.total_seconds() if isinstance(stale_ttl, timedelta) else stale_ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()  # Guards the counters, updated from every worker thread
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.corrupt = 0
+        conn = self._conn()
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries '
+            '(key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+            'fresh_until REAL NOT NULL, expires_at REAL NOT NULL)'
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def load(self, key):
+        """Return (value, seconds until stale) or (None, 0) on a miss"""
+        try:
+            now = time.time()
+            row = self._conn().execute(
+                'SELECT value, fresh_until FROM entries WHERE key = ? AND expires_at > ?',
+                (key, now)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache read failed: {str(e)}")
+            return None, 0
+        value = None
+        if row is not None:
+            try:
+                value = json.loads(zlib.decompress(row[0]))
+            except (zlib.error, ValueError, TypeError) as e:
+                # A torn or corrupt row is dropped and refetched rather than failing every request
+                logger.warning(f"Disk cache entry {key} unreadable, discarding: {str(e)}")
+                self._discard(key)
+                row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None, 0
+            self.hits += 1
+        return value, row[1] - now
+
+    def _discard(self, key):
+        with self._lock:
+            self.corrupt += 1
+        try:
+            self._conn().execute('DELETE FROM entries WHERE key = ?', (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache delete failed: {str(e)}")
+
+    def store(self, key, value, ttl):
+        try:
+            now = time.time()
+            conn = self._conn()
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (key, value, fresh_until, expires_at) '
+                'VALUES (?, ?, ?, ?)',
+                (key, zlib.compress(json.dumps(value).encode()), now + ttl,
+                 now + ttl + self.stale_ttl)
+            )
+            with self._lock:
+                self._writes += 1
+                compact = self._writes % DISK_CACHE_COMPACT_EVERY == 0
+            if compact:
+                self.compact()
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache write failed: {str(e)}")
+
+    def compact(self):
+        """Purge expired rows and return their pages to the filesystem"""
+        conn = self._conn()
+        removed = conn.execute('DELETE FROM entries WHERE expires_at <= ?', (time.time(),)).rowcount
+        conn.execute('PRAGMA incremental_vacuum')
+        if removed:
+            logger.info(f"Disk cache compacted: {removed} expired entries removed")
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {"path": self.path, "hits": self.hits, "misses": self.misses, "corrupt": self.corrupt}
+
+# e.g. /var/cache/medintel/scrape.db; unset keeps scrape results in memory only
+DISK_CACHE_PATH = os.environ.get('MEDINTEL_DISK_CACHE_PATH')
+disk_cache = DiskCache(DISK_CACHE_PATH, stale_ttl=STALE_WHILE_REVALIDATE) if DISK_CACHE_PATH else None
+
+def store_scrape_locally(cache_key, scraped_data, ttl=None):
+    """Write a settled scrape to the in-memory and on-disk tiers"""
+    ttl = ttl or scrape_cache.ttl
+    scrape_cache.set(cache_key, scraped_data, ttl=ttl)
+    if disk_cache is not None:
+        disk_cache.store(cache_key, scraped_data, ttl)
+
+# Wall-clock budget for source enrichment in /analyze; late sources finish in the background
+ENRICHMENT_DEADLINE = int(os.environ.get('MEDINTEL_ENRICHMENT_DEADLINE_MS', '800')) / 1000
 
 # ==================== RATE LIMITING ====================
-rate_limit_store = defaultdict(list)
 MAX_REQUESTS_PER_MINUTE = 20
+RATE_LIMIT_WINDOW = 60  # Seconds
+RATE_LIMIT_SWEEP_INTERVAL = 60  # Seconds between evictions of idle clients
+
+class SlidingWindowRateLimiter:
+    """Sliding-window counter rate limiter with constant memory per client
+
+    Each key keeps only the current and previous fixed-window counts; the
+    rolling rate is the current count plus the previous one weighted by how
+    much of it still overlaps the sliding window. Idle keys are evicted in
+    the background. With a shared backend the counters live there, so the
+    limit holds across workers and nodes (falling back to local counting if
+    the backend is unreachable).
+    """
+
+    def __init__(self, limit, window=RATE_LIMIT_WINDOW, backend=None,
+                 sweep_interval=RATE_LIMIT_SWEEP_INTERVAL):
+        self.limit = limit
+        self.window = window
+        self.backend = backend
+        self._windows = {}  # key -> [window index, current count, previous count]
+        self._lock = threading.Lock()
+        self._reject_lock = threading.Lock()
+        self.rejected = 0
+        if sweep_interval:
+            threading.Thread(
+                target=self._sweep_loop, args=(sweep_interval,),
+                name='rate-limit-sweeper', daemon=True
+            ).start()
+
+    def allow(self, key):
+        """Count one request for key; False if it would exceed the limit"""
+        return self.take(key, 1) == 1
+
+    def take(self, key, amount):
+        """Count up to amount requests for key; returns how many fit within the limit"""
+        now = time.time()
+        index = int(now // self.window)
+        overlap = 1 - (now % self.window) / self.window
+
+        if self.backend is not None:
+            granted = self._take_shared(key, amount, index, overlap)
+            if granted is not None:
+                return granted
+
+        with self._lock:
+            entry = self._windows.get(key)
+            if entry is None:
+                entry = self._windows[key] = [index, 0, 0]
+            elif entry[0] != index:
+                entry[2] = entry[1] if entry[0] == index - 1 else 0
+                entry[1] = 0
+                entry[0] = index
+            granted = self._grant(entry[2] * overlap + entry[1], amount)
+            entry[1] += granted
+            return granted
+
+    def _grant(self, used, amount):
+        # A partly used slot still admits one more, as a single request always has
+        granted = max(0, min(amount, math.ceil(self.limit - used)))
+        if granted < amount:
+            with self._reject_lock:
+                self.rejected += 1
+        return granted
+
+    def _take_shared(self, key, amount, index, overlap):
+        # Attempts are counted before the check, so clients hammering past the
+        # limit keep their window full for as long as they keep trying
+        prefix = f'ratelimit:{key}'
+        current = self.backend.incr(f'{prefix}:{index}', self.window * 2, amount)
+        previous = self.backend.get_counter(f'{prefix}:{index - 1}')
+        if current is None or previous is None:
+            return None
+        return self._grant(previous * overlap + current - amount, amount)
+
+    def sweep(self):
+        """Evict keys with no requests in the current or previous window"""
+        index = int(time.time() // self.window)
+        with self._lock:
+            idle = [key for key, entry in self._windows.items() if entry[0] < index - 1]
+            for key in idle:
+                del self._windows[key]
+        return len(idle)
+
+    def _sweep_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Rate limiter sweep failed: {str(e)}")
+
+    def stats(self):
+        return {
+            "tracked_clients": len(self._windows),
+            "rejected": self.rejected,
+            "shared_backend": self.backend.name if self.backend is not None else None
+        }
+
+# MEDINTEL_SHARED_RATE_LIMIT=1 keeps counters in the shared cache backend
+rate_limiter = SlidingWindowRateLimiter(
+    MAX_REQUESTS_PER_MINUTE,
+    backend=shared_cache if os.environ.get('MEDINTEL_SHARED_RATE_LIMIT') == '1' else None
+)
 
 def check_rate_limit(ip_address):
     """Check if IP has exceeded rate limit"""
-    current_time = time.time()
-    # Clean old requests
-    rate_limit_store[ip_address] = [
-        req_time for req_time in rate_limit_store[ip_address]
-        if current_time - req_time < 60
-    ]
-    
-    if len(rate_limit_store[ip_address]) >= MAX_REQUESTS_PER_MINUTE:
-        return False
-    
-    rate_limit_store[ip_address].append(current_time)
-    return True
+    return rate_limiter.allow(ip_address)
+
+# ==================== REQUEST COALESCING ====================
+class _Call:
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one execution
+
+    The first caller runs the function; callers arriving while it is in
+    flight block and receive the same result (or exception).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        if call.waiters:
+            logger.info(f"{self.name}: shared result with {call.waiters} waiting request(s)")
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executions": self.executions,
+                "coalesced": self.coalesced
+            }
+
+analysis_flight = SingleFlight('analysis')
+scrape_flight = SingleFlight('scrape')
+
+# ==================== METRICS ====================
+# Upper bounds in seconds; covers sub-millisecond local stages up to full scrape timeouts
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """A labelled metric family rendered in the Prometheus text format"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, description, labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+            for labels, value in items:
+                lines.extend(self._samples(list(zip(self.labelnames, labels)), value))
+        return lines
+
+    def _samples(self, pairs, value):
+        return [f'{self.name}{_format_labels(pairs)} {_format_value(value)}']
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+class Histogram(Metric):
+    """Fixed-bucket histogram; observe() is a bisect and a locked increment"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, description, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def time(self, *labels):
+        """Context manager observing the wall time of its block"""
+        return _Timer(self, labels)
+
+    def _samples(self, pairs, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{_format_labels(pairs + [("le", _format_value(bound))])} {cumulative}')
+        lines.append(f'{self.name}_sum{_format_labels(pairs)} {total!r}')
+        lines.append(f'{self.name}_count{_format_labels(pairs)} {cumulative}')
+        return lines
+
+    def render(self):
+        with self._lock:
+            snapshot = {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.kind}']
+        for labels, value in sorted(snapshot.items()):
+            lines.extend(self._samples(list(zip(self.labelnames, labels)), value))
+        return lines
+
+class MetricsRegistry:
+    """Owns the process's metrics plus collectors sampled at scrape time
+
+    A collector is a callable returning (name, kind, description, samples)
+    tuples, where samples is a list of (labels dict, value). It suits values
+    that already live elsewhere, such as cache counters.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, description, labelnames=()):
+        return self._register(Counter(name, description, labelnames))
+
+    def gauge(self, name, description, labelnames=()):
+        return self._register(Gauge(name, description, labelnames))
+
+    def histogram(self, name, description, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, description, labelnames, buckets))
+
+    def register_collector(self, collector):
+        self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector {collector.__name__} failed: {e}")
+                continue
+            for name, kind, description, samples in families:
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(list(labels.items()))} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+stage_latency = metrics.histogram(
+    'medintel_stage_duration_seconds', 'Latency of each analysis pipeline stage', ('stage',))
+source_latency = metrics.histogram(
+    'medintel_scrape_source_duration_seconds', 'Latency of successful upstream fetches', ('source',))
+upstream_errors = metrics.counter(
+    'medintel_upstream_errors_total', 'Failed upstream fetches by source and error kind', ('source', 'kind'))
+http_requests = metrics.counter(
+    'medintel_http_requests_total', 'HTTP responses by endpoint and status code', ('endpoint', 'status'))
+http_latency = metrics.histogram(
+    'medintel_http_request_duration_seconds', 'HTTP request latency, including streamed bodies', ('endpoint',))
+http_in_flight = metrics.gauge(
+    'medintel_http_requests_in_flight', 'HTTP requests currently being served', ('endpoint',))
 
 # ==================== KNOWLEDGE BASE ====================
-KNOWLEDGE_BASE = {
-    "emergency_keywords": [
-        "chest pain", "heart attack", "stroke", "unconscious", "seizure",
-        "severe bleeding", "difficulty breathing", "choking", "severe burns",
-        "poisoning", "overdose", "severe allergic reaction", "anaphylaxis",
-        "suicide", "severe head injury", "paralysis", "confusion severe"
-    ],
-    "symptom_synonyms": {
-        "fever": ["high temperature", "pyrexia", "hot", "burning up"],
-        "headache": ["head pain", "migraine", "head ache"],
-        "cough": ["coughing", "hacking"],
-        "chest pain": ["tight chest", "chest pressure", "angina"],
-        "nausea": ["sick", "queasy", "feeling sick"],
-        "vomiting": ["throwing up", "being sick", "puking"],
-        "dizziness": ["dizzy", "lightheaded", "vertigo"],
-        "fatigue": ["tired", "exhausted", "weakness", "weak"],
-        "shortness of breath": ["breathless", "difficulty breathing", "dyspnea"],
-        "sweating": ["perspiration", "sweaty", "night sweats"],
-        "abdominal pain": ["stomach pain", "belly ache", "tummy pain"],
-        "diarrhea": ["loose stools", "runs"],
-        "constipation": ["blocked", "difficulty passing stool"],
-        "rash": ["skin rash", "hives", "spots"],
-        "sore throat": ["throat pain", "painful throat"],
-        "joint pain": ["arthralgia", "aching joints"],
-        "muscle pain": ["myalgia", "muscle ache"],
-        "confusion": ["disorientation", "confused", "mental fog"],
-        "back pain": ["backache", "spine pain"]
-    },
-    "conditions_data": {
-        "Heart Attack": {
-            "symptoms": ["chest pain", "shortness of breath", "sweating", "nausea", "dizziness"],
-            "weights": {"chest pain": 10, "shortness of breath": 8, "sweating": 6, "nausea": 4, "dizziness": 5},
-            "risk_factors": ["smoking", "high blood pressure", "diabetes", "family history", "obesity"],
-            "emergency": True,
-            "prevention": ["healthy diet", "regular exercise", "quit smoking", "manage stress"],
-            "recommendations": ["Call 911 immediately", "Chew aspirin if not allergic", "Stay calm", "Loosen tight clothing"]
-        },
-        "Stroke": {
-            "symptoms": ["facial drooping", "arm weakness", "speech difficulty", "confusion", "severe headache", "dizziness", "vision problems"],
-            "weights": {"facial drooping": 10, "arm weakness": 10, "speech difficulty": 9, "confusion": 8, "severe headache": 7},
-            "risk_factors": ["high blood pressure", "smoking", "diabetes", "atrial fibrillation", "high cholesterol"],
-            "emergency": True,
-            "prevention": ["control blood pressure", "healthy diet", "exercise", "limit alcohol"],
-            "recommendations": ["Call 911 immediately", "Note time symptoms started", "Do not give food or drink", "Keep person comfortable"]
-        },
-        "Common Cold": {
-            "symptoms": ["cough", "sore throat", "runny nose", "sneezing", "mild fever", "fatigue"],
-            "weights": {"cough": 5, "sore throat": 5, "runny nose": 5, "sneezing": 4, "mild fever": 3, "fatigue": 3},
-            "risk_factors": ["close contact with infected person", "weakened immune system", "stress"],
-            "emergency": False,
-            "prevention": ["wash hands frequently", "avoid close contact with sick people", "healthy lifestyle"],
-            "recommendations": ["Rest", "Stay hydrated", "Use over-the-counter medications", "See doctor if symptoms worsen"]
-        },
-        "Influenza (Flu)": {
-            "symptoms": ["high fever", "cough", "sore throat", "muscle pain", "fatigue", "headache", "chills"],
-            "weights": {"high fever": 7, "cough": 6, "muscle pain": 6, "fatigue": 5, "headache": 5, "chills": 6},
-            "risk_factors": ["weak immune system", "chronic conditions", "pregnancy", "young or elderly age"],
-            "emergency": False,
-            "prevention": ["annual flu vaccine", "hand hygiene", "avoid sick contacts"],
-            "recommendations": ["Rest", "Fluids", "Antiviral medications (if prescribed)", "Monitor for complications"]
-        },
-        "Migraine": {
-            "symptoms": ["severe headache", "nausea", "vomiting", "sensitivity to light", "visual disturbances"],
-            "weights": {"severe headache": 9, "nausea": 6, "vomiting": 5, "sensitivity to light": 7, "visual disturbances": 7},
-            "risk_factors": ["family history", "hormonal changes", "stress", "certain foods", "lack of sleep"],
-            "emergency": False,
-            "prevention": ["identify triggers", "maintain regular sleep", "stress management", "regular meals"],
-            "recommendations": ["Dark quiet room", "Pain medication", "Cold compress", "Consult neurologist if frequent"]
-        },
-        "Gastroenteritis": {
-            "symptoms": ["diarrhea", "vomiting", "nausea", "abdominal pain", "fever", "dehydration"],
-            "weights": {"diarrhea": 8, "vomiting": 7, "nausea": 6, "abdominal pain": 7, "fever": 5},
-            "risk_factors": ["contaminated food/water", "poor hygiene", "close contact with infected person"],
-            "emergency": False,
-            "prevention": ["hand washing", "food safety", "clean water", "avoid contaminated sources"],
-            "recommendations": ["Hydration", "Oral rehydration salts", "Bland diet", "Rest", "See doctor if severe"]
-        },
-        "Pneumonia": {
-            "symptoms": ["cough", "fever", "shortness of breath", "chest pain", "fatigue", "chills"],
-            "weights": {"cough": 7, "fever": 7, "shortness of breath": 8, "chest pain": 7, "fatigue": 5, "chills": 6},
-            "risk_factors": ["smoking", "chronic lung disease", "weakened immune system", "age over 65"],
-            "emergency": False,
-            "prevention": ["vaccination", "hand hygiene", "healthy lifestyle", "avoid smoking"],
-            "recommendations": ["See doctor", "Antibiotics if bacterial", "Rest", "Fluids", "Monitor breathing"]
-        },
-        "Allergic Reaction": {
-            "symptoms": ["rash", "itching", "swelling", "difficulty breathing", "hives"],
-            "weights": {"rash": 5, "itching": 4, "swelling": 7, "difficulty breathing": 10, "hives": 6},
-            "risk_factors": ["known allergies", "family history", "asthma"],
-            "emergency": False,
-            "prevention": ["avoid allergens", "carry epinephrine if severe allergies", "read food labels"],
-            "recommendations": ["Antihistamines", "Avoid allergen", "Call 911 if anaphylaxis", "See allergist"]
-        },
-        "Anxiety Disorder": {
-            "symptoms": ["excessive worry", "restlessness", "fatigue", "difficulty concentrating", "muscle tension", "sleep problems"],
-            "weights": {"excessive worry": 8, "restlessness": 6, "fatigue": 5, "difficulty concentrating": 6, "muscle tension": 5},
-            "risk_factors": ["stress", "trauma", "family history", "personality", "chronic illness"],
-            "emergency": False,
-            "prevention": ["stress management", "regular exercise", "adequate sleep", "limit caffeine"],
-            "recommendations": ["Therapy", "Relaxation techniques", "Exercise", "Consult mental health professional"]
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+KNOWLEDGE_BASE_PATH = os.environ.get(
+    'MEDINTEL_KB_PATH', os.path.join(BASE_DIR, 'data', 'knowledge_base.json')
+)
+KB_RELOAD_INTERVAL = 5  # Seconds between checks for an updated knowledge base file
+KB_FORMAT_VERSION = 5  # Bump whenever the compiled snapshot layout or the lexicon changes
+# Real words the typo corrector must leave alone; see TypoCorrector
+LEXICON_PATH = os.environ.get('MEDINTEL_LEXICON_PATH', os.path.join(BASE_DIR, 'data', 'lexicon.txt.gz'))
+
+def read_knowledge_base(path):
+    """Parse a JSON or YAML knowledge base file; returns (data, sha256 digest)"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if path.endswith(('.yaml', '.yml')):
+        if yaml is None:
+            raise RuntimeError("PyYAML is required to load a YAML knowledge base")
+        data = yaml.safe_load(raw)
+    else:
+        data = json.loads(raw)
+    for key in ('emergency_keywords', 'symptom_synonyms', 'conditions_data'):
+        if key not in data:
+            raise ValueError(f"Knowledge base {path} is missing '{key}'")
+    return data, hashlib.sha256(raw).hexdigest()
+
+def intern_strings(value):
+    """Recursively intern strings so repeated symptom names share one object"""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {sys.intern(k): intern_strings(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [intern_strings(v) for v in value]
+    return value
+
+def condition_fragment(condition):
+    """Static per-condition payload, built once per knowledge base rather than per request
+
+    "ranked" holds the fields every possible_conditions entry repeats;
+    recommendations and prevention are pre-truncated the way
+    generate_insights() reports them.
+    """
+    return {
+        "ranked": {
+            "symptoms": condition["symptoms"],
+            "risk_factors": condition["risk_factors"],
+            "is_emergency": condition["emergency"]
         },
-        "Urinary Tract Infection": {
-            "symptoms": ["frequent urination", "burning sensation", "cloudy urine", "pelvic pain", "fever"],
-            "weights": {"frequent urination": 7, "burning sensation": 8, "cloudy urine": 6, "pelvic pain": 7, "fever": 5},
-            "risk_factors": ["female gender", "sexual activity", "certain contraceptives", "urinary tract abnormalities"],
-            "emergency": False,
-            "prevention": ["adequate hydration", "urinate after intercourse", "wipe front to back", "avoid irritating products"],
-            "recommendations": ["See doctor", "Antibiotics", "Increase fluids", "Pain relief medication"]
-        }
+        "recommendations": condition.get("recommendations", [])[:4],
+        "prevention": condition.get("prevention", [])[:3]
     }
-}
+
+class KnowledgeBase:
+    """Immutable compiled snapshot: raw data plus its symptom matcher and scoring index"""
+
+    def __init__(self, data, matcher, index, digest):
+        self.data = data
+        self.conditions = data["conditions_data"]
+        self.matcher = matcher
+        self.index = index
+        self.digest = digest
+        self.fragments = {
+            name: condition_fragment(condition) for name, condition in self.conditions.items()
+        }
+        self.loaded_at = datetime.now()
+
+    @classmethod
+    def compile(cls, data, digest):
+        data = intern_strings(data)
+        # A typo must never add a symptom that could rank an emergency condition first
+        protected = {
+            symptom for condition in data["conditions_data"].values() if condition.get("emergency")
+            for symptom in condition["weights"]
+        }
+        return cls(
+            data,
+            SymptomMatcher(data["symptom_synonyms"], data["emergency_keywords"],
+                           protected, read_lexicon(LEXICON_PATH)),
+            ConditionIndex(data["conditions_data"]),
+            digest
+        )
+
+    def to_state(self):
+        return {
+            'format': KB_FORMAT_VERSION,
+            'digest': self.digest,
+            'data': self.data,
+            'matcher': self.matcher.to_state(),
+            'index': self.index.to_state()
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(
+            state['data'],
+            SymptomMatcher.from_state(state['matcher']),
+            ConditionIndex.from_state(state['index']),
+            state['digest']
+        )
+
+class KnowledgeBaseStore:
+    """Holds the live KnowledgeBase and swaps in a recompiled one when the file changes
+
+    Readers take `current` once per request. Replacing that reference is
+    atomic, so a reload never exposes a half-built snapshot or drops a request.
+    The compiled snapshot is pickled next to the source file, letting workers
+    skip compilation and load it straight from an mmap.
+    """
+
+    def __init__(self, path, reload_interval=KB_RELOAD_INTERVAL):
+        self.path = path
+        self.compiled_path = path + '.compiled.pickle'
+        self._signature = None
+        self._reload_lock = threading.Lock()
+        self.current = self._load()
+        if reload_interval:
+            threading.Thread(
+                target=self._watch, args=(reload_interval,),
+                name='kb-watcher', daemon=True
+            ).start()
+
+    def _file_signature(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self):
+        signature = self._file_signature()
+        data, digest = read_knowledge_base(self.path)
+        kb = self._load_compiled(digest)
+        if kb is None:
+            kb = KnowledgeBase.compile(data, digest)
+            self._write_compiled(kb)
+        self._signature = signature
+        logger.info(f"Knowledge base {digest[:12]} loaded: {len(kb.conditions)} conditions")
+        return kb
+
+    def _load_compiled(self, digest):
+        try:
+            with open(self.compiled_path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                state = pickle.loads(mapped)
+            if state.get('format') != KB_FORMAT_VERSION or state.get('digest') != digest:
+                return None
+            return KnowledgeBase.from_state(state)
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError, KeyError, AttributeError):
+            return None
+
+    def _write_compiled(self, kb):
+        tmp_path = f"{self.compiled_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(kb.to_state(), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.compiled_path)
+        except OSError as e:
+            logger.warning(f"Could not write compiled knowledge base: {str(e)}")
+
+    def reload_if_changed(self):
+        """Recompile and swap in the knowledge base if its file changed"""
+        with self._reload_lock:
+            try:
+                if self._file_signature() == self._signature:
+                    return False
+                kb = self._load()
+            except Exception as e:
+                # Keep serving the last good snapshot
+                logger.error(f"Knowledge base reload failed: {str(e)}")
+                return False
+            if kb.digest == self.current.digest:
+                return False
+            self.current = kb
+            return True
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            self.reload_if_changed()
 
 # ==================== MEDICAL SOURCES ====================
 MEDICAL_SOURCES = {
@@ -206,36 +1196,285 @@ def sanitize_input(text):
     return text.strip()
 
 # ==================== SYMPTOM PROCESSING ====================
+STOP_WORDS = frozenset({'a', 'an', 'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'is', 'am', 'are', 'was', 'were', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'should', 'could', 'may', 'might', 'must', 'can', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'my', 'your', 'his', 'her', 'its', 'our', 'their', 'very', 'so', 'lot'})
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+def normalize_token(token, vocabulary):
+    """Fold a simple plural onto a vocabulary token, so "headaches" matches "headache"
+
+    Vocabulary phrases are kept as written: "runs" and "spots" are synonyms
+    in their own right, and folding them would make "run" and "spot" match.
+    """
+    if token not in vocabulary and len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        singular = token[:-1]
+        if singular in vocabulary:
+            return singular
+    return token
+
+def max_edit_distance(length):
+    """Typos tolerated in a token of this length; short words are too ambiguous"""
+    return 0 if length < 5 else 1
+
+def read_lexicon(path):
+    """Known English words from a gzipped word-per-line file; empty (with a warning) if unreadable"""
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return frozenset(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    except OSError as e:
+        logger.warning(f"Lexicon {path} unavailable, correcting typos without it: {str(e)}")
+        return frozenset()
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance between a and b, or limit + 1 once past limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1,
+                        previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before_previous[j - 2] + 1)  # Transposition
+            current[j] = value
+        if min(current) > limit:
+            return limit + 1
+        before_previous, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+class TypoCorrector:
+    """SymSpell-style deletion index from misspelled tokens to vocabulary tokens
+
+    Each vocabulary token is indexed under every variant with up to
+    max_edit_distance characters deleted. A lookup generates the input's own
+    deletion variants and verifies only the few terms sharing one, so its
+    cost depends on the token's length rather than the vocabulary's size.
+
+    Real words are never corrected: the lexicon entries within an edit of
+    some term ("timed" next to "tired") are kept and passed through as
+    written. Only that neighbourhood is stored, not the whole lexicon.
+    """
+
+    CACHE_SIZE = 50000  # Memoized lookups, mostly ordinary words with no correction
+    ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+
+    def __init__(self, terms, lexicon=frozenset()):
+        self.terms = {}  # term -> rank; earlier terms win ties
+        self._deletes = {}
+        for term in terms:
+            if term in self.terms:
+                continue
+            self.terms[term] = len(self.terms)
+            for variant in self._variants(term, max_edit_distance(len(term))):
+                self._deletes.setdefault(variant, []).append(term)
+        self.words = frozenset(
+            word for term in self.terms if max_edit_distance(len(term))
+            for word in self._edits(term) if word in lexicon and word not in self.terms
+        )
+        self._cache = {}
+
+    def to_state(self):
+        return {'terms': self.terms, 'deletes': self._deletes, 'words': self.words}
+
+    @classmethod
+    def from_state(cls, state):
+        corrector = cls.__new__(cls)
+        corrector.terms = state['terms']
+        corrector._deletes = state['deletes']
+        corrector.words = state['words']
+        corrector._cache = {}
+        return corrector
+
+    @classmethod
+    def _edits(cls, word):
+        """Every string one deletion, transposition, substitution or insertion away"""
+        splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+        edits = {a + b[1:] for a, b in splits if b}
+        edits |= {a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1}
+        edits |= {a + c + b[1:] for a, b in splits if b for c in cls.ALPHABET}
+        edits |= {a + c + b for a, b in splits for c in cls.ALPHABET}
+        return edits
+
+    @staticmethod
+    def _variants(word, distance):
+        variants = {word}
+        frontier = {word}
+        for _ in range(distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+            variants |= frontier
+        return variants
+
+    def correct(self, token):
+        """Closest vocabulary token within the tolerated distance, or None"""
+        try:
+            return self._cache[token]
+        except KeyError:
+            pass
+        if token in self.words:
+            return None
+
+        best = None
+        best_key = None
+        limit = max_edit_distance(len(token))
+        if limit:
+            checked = set()
+            for variant in self._variants(token, limit):
+                for term in self._deletes.get(variant, ()):
+                    if term in checked:
+                        continue
+                    checked.add(term)
+                    # A short vocabulary term tolerates fewer typos than a long input
+                    term_limit = min(limit, max_edit_distance(len(term)))
+                    distance = edit_distance(token, term, term_limit)
+                    if distance <= term_limit:
+                        key = (distance, self.terms[term])
+                        if best_key is None or key < best_key:
+                            best, best_key = term, key
+
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache.clear()
+        self._cache[token] = best
+        return best
+
+class SymptomMatcher:
+    """Token-level Aho-Corasick automaton over symptom and emergency phrases
+
+    The vocabulary is compiled once; match() then finds every canonical
+    symptom and emergency keyword in a single pass over the input tokens.
+    Stop words in the input are transparent to plain symptom phrases (as
+    before); emergency phrases and phrases that themselves contain stop
+    words must appear verbatim in the original text. Tokens outside the
+    vocabulary are first passed through a TypoCorrector, so "headach" or
+    "diarhea" still match. Words in the lexicon are never corrected, and
+    corrections only ever land on tokens of symptoms outside
+    protected_symptoms (those of emergency conditions) and outside every
+    emergency phrase, so a typo can't raise the emergency flag. Emergency
+    phrases are checked against the tokens as typed.
+    """
+
+    def __init__(self, symptom_synonyms, emergency_keywords, protected_symptoms=(), lexicon=frozenset()):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        # Results come back in vocabulary order so equivalent inputs agree
+        self._rank = {symptom: i for i, symptom in enumerate(symptom_synonyms)}
+        correctable = []
+        protected = set()
+
+        for symptom, synonyms in symptom_synonyms.items():
+            for phrase in [symptom] + list(synonyms):
+                tokens = self._add(phrase, ('symptom', symptom))
+                (protected.update if symptom in protected_symptoms else correctable.extend)(tokens)
+        for keyword in emergency_keywords:
+            protected.update(self._add(keyword, ('emergency', keyword)))
+        self._build_failure_links()
+        self._vocabulary = frozenset(correctable) | protected
+        self._corrector = TypoCorrector([t for t in correctable if t not in protected], lexicon)
+
+    def to_state(self):
+        return {'goto': self._goto, 'fail': self._fail, 'out': self._out, 'rank': self._rank,
+                'vocabulary': self._vocabulary, 'corrector': self._corrector.to_state()}
+
+    @classmethod
+    def from_state(cls, state):
+        matcher = cls.__new__(cls)
+        matcher._goto = state['goto']
+        matcher._fail = state['fail']
+        matcher._out = state['out']
+        matcher._rank = state['rank']
+        matcher._vocabulary = state['vocabulary']
+        matcher._corrector = TypoCorrector.from_state(state['corrector'])
+        return matcher
+
+    @staticmethod
+    def _tokenize(phrase):
+        tokens = TOKEN_PATTERN.findall(phrase.lower())
+        return tokens, [t for t in tokens if t not in STOP_WORDS]
+
+    def _add(self, phrase, output):
+        """Insert phrase into the trie; returns the tokens it is keyed on"""
+        original, filtered = self._tokenize(phrase)
+        if not filtered:
+            return filtered
+        kind, value = output
+        exact = None
+        lead = 0
+        if kind == 'emergency' or len(filtered) != len(original):
+            exact = tuple(original)
+            while original[lead] in STOP_WORDS:
+                lead += 1
+        state = 0
+        for token in filtered:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][token] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append((kind, value, len(filtered), lead, exact))
+        return filtered
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                link = self._goto[fallback].get(token, 0)
+                self._fail[child] = link if link != child else 0
+                self._out[child].extend(self._out[self._fail[child]])
+
+    def match(self, text):
+        """Return (canonical symptoms in vocabulary order, emergency flag)"""
+        goto, fail, out = self._goto, self._fail, self._out
+        vocabulary, correct = self._vocabulary, self._corrector.correct
+        detected = {}
+        emergency = False
+        typed = tokens = TOKEN_PATTERN.findall(text.lower())
+        positions = []  # Index into tokens of each non-stop-word token
+        state = 0
+
+        for position, token in enumerate(tokens):
+            if token in STOP_WORDS:
+                continue
+            token = normalize_token(token, vocabulary)
+            if token not in vocabulary:
+                corrected = correct(token)
+                if corrected is not None:
+                    # Symptom exact-window checks see the correction; emergency ones keep typed
+                    if tokens is typed:
+                        tokens = list(typed)
+                    token = tokens[position] = corrected
+            positions.append(position)
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+
+            for kind, value, filtered_len, lead, exact in out[state]:
+                if exact is not None:
+                    start = positions[-filtered_len] - lead
+                    source = typed if kind == 'emergency' else tokens
+                    window = source[start:start + len(exact)] if start >= 0 else ()
+                    if len(window) != len(exact) or any(
+                            normalize_token(t, vocabulary) != e for t, e in zip(window, exact)):
+                        continue
+                if kind == 'symptom':
+                    detected[value] = True
+                else:
+                    emergency = True
+
+        return sorted(detected, key=self._rank.__getitem__), emergency
+
 def process_symptoms(input_text):
     """Process and normalize symptom input"""
-    input_text = input_text.lower()
-    
-    # Remove stop words
-    stop_words = {'a', 'an', 'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'is', 'am', 'are', 'was', 'were', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'should', 'could', 'may', 'might', 'must', 'can', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'my', 'your', 'his', 'her', 'its', 'our', 'their', 'very', 'so', 'lot'}
-    
-    words = input_text.split()
-    filtered_words = [w for w in words if w not in stop_words]
-    processed_text = ' '.join(filtered_words)
-    
-    # Extract symptoms
-    detected_symptoms = set()
-    
-    # Check for exact matches and synonyms
-    for symptom, synonyms in KNOWLEDGE_BASE["symptom_synonyms"].items():
-        if symptom in processed_text:
-            detected_symptoms.add(symptom)
-        for syn in synonyms:
-            if syn in processed_text:
-                detected_symptoms.add(symptom)
-    
-    # Check for emergency keywords
-    emergency_detected = False
-    for keyword in KNOWLEDGE_BASE["emergency_keywords"]:
-        if keyword in input_text:
-            emergency_detected = True
-            break
-    
-    return list(detected_symptoms), emergency_detected
+    return knowledge_store.current.matcher.match(input_text)
 
 # ==================== RISK SCORING ENGINE ====================
 def calculate_risk_score(symptoms, condition_data):
@@ -269,91 +1508,911 @@ def get_severity_level(score):
     else:
         return "Low"
 
-# ==================== WEB SCRAPING ENGINE ====================
-def scrape_medical_info(query, max_sources=3):
-    """Scrape medical information from trusted sources"""
-    cache_key = hashlib.md5(query.encode()).hexdigest()
-    
-    # Check cache
-    if cache_key in scrape_cache:
-        cache_entry = scrape_cache[cache_key]
-        if datetime.now() - cache_entry['timestamp'] < CACHE_DURATION:
-            logger.info(f"Cache hit for query: {query}")
-            return cache_entry['data']
-    
-    scraped_data = []
-    
-    for source_name, source_config in list(MEDICAL_SOURCES.items())[:max_sources]:
-        try:
-            # Build search URL
-            search_url = source_config["search_url"] + quote_plus(query)
-            
-            # Set headers
-            headers = {
-                'User-Agent': source_config["user_agent"],
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1'
-            }
-            
-            # Make request with timeout
-            response = requests.get(search_url, headers=headers, timeout=5)
+class ConditionIndex:
+    """Inverted symptom -> (condition, weight) index over the knowledge base
+
+    Only conditions sharing at least one detected symptom are touched, and
+    each condition's max possible weight is summed once at build time.
+    """
+
+    # Below this many postings, numpy's call overhead outweighs vectorizing
+    NUMPY_MIN_POSTINGS = 256
+
+    def __init__(self, conditions_data):
+        self.names = list(conditions_data)
+        self.max_possible = array('d', (
+            sum(conditions_data[name]["weights"].values()) for name in self.names
+        ))
+
+        postings = defaultdict(lambda: (array('i'), array('d')))
+        for condition_id, name in enumerate(self.names):
+            for symptom, weight in conditions_data[name]["weights"].items():
+                ids, weights = postings[symptom]
+                ids.append(condition_id)
+                weights.append(weight)
+        self.postings = dict(postings)
+        self._prepare_numpy()
+
+    def _prepare_numpy(self):
+        if np is not None:
+            # Zero-copy views over the array-backed postings
+            self._np_postings = {
+                symptom: (np.frombuffer(ids, dtype=np.int32), np.frombuffer(weights, dtype=np.float64))
+                for symptom, (ids, weights) in self.postings.items()
+            }
+
+    def to_state(self):
+        return {'names': self.names, 'max_possible': self.max_possible, 'postings': self.postings}
+
+    @classmethod
+    def from_state(cls, state):
+        index = cls.__new__(cls)
+        index.names = state['names']
+        index.max_possible = state['max_possible']
+        index.postings = state['postings']
+        index._prepare_numpy()
+        return index
+
+    def score(self, symptoms):
+        """Return [(condition_id, score 0-100)] for every condition with a match"""
+        hits = [self.postings[s] for s in dict.fromkeys(symptoms) if s in self.postings]
+        if not hits:
+            return []
+        if np is not None and sum(len(ids) for ids, _ in hits) >= self.NUMPY_MIN_POSTINGS:
+            return self._score_numpy(symptoms)
+
+        totals = defaultdict(float)
+        for ids, weights in hits:
+            for condition_id, weight in zip(ids, weights):
+                totals[condition_id] += weight
+        return [
+            (condition_id, self._normalize(total, self.max_possible[condition_id]))
+            for condition_id, total in totals.items()
+        ]
+
+    def _score_numpy(self, symptoms):
+        hits = [self._np_postings[s] for s in dict.fromkeys(symptoms) if s in self._np_postings]
+        ids = np.concatenate([ids for ids, _ in hits])
+        weights = np.concatenate([w for _, w in hits])
+        # Sparse accumulate: sum weights per distinct condition id
+        matched, inverse = np.unique(ids, return_inverse=True)
+        totals = np.bincount(inverse, weights=weights)
+        return [
+            (int(condition_id), self._normalize(float(total), self.max_possible[condition_id]))
+            for condition_id, total in zip(matched, totals)
+        ]
+
+    @staticmethod
+    def _normalize(total, max_possible):
+        # Same arithmetic as calculate_risk_score so rankings are unchanged
+        if max_possible <= 0:
+            return 0
+        return round((total / max_possible) * 100, 1)
+
+    def top(self, scores, k):
+        """Partial sort: best k by score, ties kept in knowledge-base order"""
+        ranked = [(score, condition_id) for condition_id, score in scores if score > 0]
+        return [
+            (self.names[condition_id], score)
+            for score, condition_id in heapq.nsmallest(k, ranked, key=lambda x: (-x[0], x[1]))
+        ]
+
+# Compiled at startup and recompiled whenever the knowledge base file changes
+knowledge_store = KnowledgeBaseStore(KNOWLEDGE_BASE_PATH)
+
+# ==================== CONTENT EXTRACTION ====================
+IRRELEVANT_TEXT = re.compile(r'cookie|privacy|advertisement', re.IGNORECASE)
+SKIPPED_TAGS = frozenset({'script', 'style', 'iframe', 'nav', 'footer', 'aside'})
+
+class ParagraphExtractor:
+    """Streams <p> text out of a page with lxml, stopping once enough is found
+
+    Paragraphs inside script/style/nav/footer/aside are ignored. When
+    container selectors ("main", "#id", ".class") are given, paragraphs
+    inside a matching ancestor are preferred and parsing stops as soon as
+    enough of them qualify; if the page has no such container, the first
+    paragraphs elsewhere are used instead.
+    """
+
+    def __init__(self, containers=(), max_paragraphs=5, max_scanned=10, min_length=50):
+        self.containers = [self._parse_selector(c) for c in containers]
+        self.max_paragraphs = max_paragraphs
+        self.max_scanned = max_scanned
+        self.min_length = min_length
+
+    @staticmethod
+    def _parse_selector(selector):
+        if selector.startswith('#'):
+            return ('id', selector[1:])
+        if selector.startswith('.'):
+            return ('class', selector[1:])
+        return ('tag', selector)
+
+    def _matches(self, element):
+        for kind, value in self.containers:
+            if kind == 'tag' and element.tag == value:
+                return True
+            if kind == 'id' and element.get('id') == value:
+                return True
+            if kind == 'class' and value in (element.get('class') or '').split():
+                return True
+        return False
+
+    def _locate(self, p):
+        """None if p sits in skipped markup, else whether it is inside a container"""
+        in_container = not self.containers
+        for ancestor in p.iterancestors():
+            if ancestor.tag in SKIPPED_TAGS:
+                return None
+            if not in_container and self._matches(ancestor):
+                in_container = True
+        return in_container
+
+    def _qualifies(self, text):
+        # Filter out short or irrelevant paragraphs
+        return len(text) > self.min_length and not IRRELEVANT_TEXT.search(text)
+
+    def extract(self, content, encoding=None):
+        """Return up to max_paragraphs qualifying paragraph texts from raw HTML bytes
+
+        encoding is the charset the server declared; without one the parser
+        goes by the page's own <meta> tag.
+        """
+        kept, scanned = [], 0
+        fallback, fallback_scanned = [], 0
+
+        try:
+            for _, p in etree.iterparse(io.BytesIO(content), events=('end',), tag='p',
+                                         html=True, recover=True, no_network=True,
+                                         encoding=encoding):
+                placement = self._locate(p)
+                if placement is not None:
+                    text = ''.join(p.itertext()).strip()
+                    if placement:
+                        scanned += 1
+                        if self._qualifies(text):
+                            kept.append(text)
+                    elif fallback_scanned < self.max_scanned:
+                        fallback_scanned += 1
+                        if self._qualifies(text):
+                            fallback.append(text)
+
+                # Free what has been read so far; ancestors stay for later lookups
+                p.clear()
+                while p.getprevious() is not None:
+                    del p.getparent()[0]
+
+                if len(kept) >= self.max_paragraphs or scanned >= self.max_scanned:
+                    break
+        except etree.XMLSyntaxError:
+            # Empty or hopelessly broken documents; keep whatever was read
+            pass
+
+        return (kept or fallback)[:self.max_paragraphs]
+
+DEFAULT_EXTRACTOR = ParagraphExtractor()
+
+# Per-source extractors targeting each site's main content container
+SOURCE_EXTRACTORS = {
+    "mayoclinic": ParagraphExtractor(containers=("#main-content", "main")),
+    "webmd": ParagraphExtractor(containers=(".search-results", "main")),
+    "nhs": ParagraphExtractor(containers=("#maincontent", "main"))
+}
+
+def register_extractor(source_name, extractor):
+    """Plug in a custom extractor (anything with extract(content) -> [str])"""
+    SOURCE_EXTRACTORS[source_name] = extractor
+
+def extractor_for(source_name):
+    return SOURCE_EXTRACTORS.get(source_name, DEFAULT_EXTRACTOR)
+
+# ==================== WEB SCRAPING ENGINE ====================
+SCRAPE_TIMEOUT = 5
+SCRAPE_MAX_WORKERS = int(os.environ.get('MEDINTEL_SCRAPE_WORKERS', '8'))
+POLITENESS_DELAY = 0.5  # Minimum gap between requests on the same connection to a host
+# A fetch that can't start within this long is dropped rather than queued: by then the
+# request that wanted it has given up, and the backlog would only grow under load
+HOST_MAX_WAIT = ENRICHMENT_DEADLINE
+
+SCRAPE_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    # Every encoding urllib3 can decode here; includes br when Brotli is installed
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+# Bounded pool shared by every request so scraping can't exhaust threads
+scrape_executor = ThreadPoolExecutor(
+    max_workers=SCRAPE_MAX_WORKERS,
+    thread_name_prefix='scraper'
+)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(host):
+    """Return the pooled keep-alive session for a host"""
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SCRAPE_MAX_WORKERS)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[host] = session
+        return session
+
+class HostBusy(Exception):
+    """A fetch was dropped because the host had no politeness slot free in time"""
+
+class HostScheduler:
+    """Dispatches fetches to the scrape pool, spacing requests per connection
+
+    Each host gets as many lanes as its session pools connections, and each
+    lane waits delay between requests, as a single client reusing that
+    connection would. Requests whose slot hasn't opened yet are parked on a
+    timer heap instead of sleeping inside a pool worker. A request whose
+    slot is more than max_wait away fails with HostBusy straight away, which
+    bounds each host's backlog to about lanes * max_wait / delay requests.
+    """
+
+    def __init__(self, executor, delay, lanes, max_wait):
+        self.executor = executor
+        self.delay = delay
+        self.lanes = lanes
+        self.max_wait = max_wait
+        self._lanes = {}  # host -> heap of the times each lane is next free
+        self._heap = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self.dropped = 0
+
+    def submit(self, host, fn, *args):
+        """Run fn(*args) on the pool once one of host's lanes is free"""
+        future = Future()
+        with self._cond:
+            now = time.monotonic()
+            lanes = self._lanes.get(host)
+            if lanes is None:
+                lanes = self._lanes[host] = [now] * self.lanes
+            slot = max(now, lanes[0])
+            if slot - now > self.max_wait:
+                self.dropped += 1
+                future.set_exception(HostBusy(host))
+                return future
+            heapq.heapreplace(lanes, slot + self.delay)
+            if slot <= now:
+                self._dispatch(future, fn, args)
+            else:
+                self._seq += 1
+                heapq.heappush(self._heap, (slot, self._seq, future, fn, args))
+                self._ensure_thread()
+                self._cond.notify()
+        return future
+
+    def _dispatch(self, future, fn, args):
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+        self.executor.submit(run)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='host-scheduler', daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        with self._cond:
+            return {"queued": len(self._heap), "dropped": self.dropped}
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                slot = self._heap[0][0]
+                delay = slot - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                _, _, future, fn, args = heapq.heappop(self._heap)
+            self._dispatch(future, fn, args)
+
+host_scheduler = HostScheduler(scrape_executor, POLITENESS_DELAY, SCRAPE_MAX_WORKERS, HOST_MAX_WAIT)
+
+# Circuit breaker: consecutive failures before a source is skipped, and for how long
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_COOLDOWN = 30  # seconds
+# Adaptive timeouts: a multiple of the source's p95 latency, clamped to this range
+ADAPTIVE_TIMEOUT_MIN = 1.0
+ADAPTIVE_TIMEOUT_FACTOR = 2.0
+LATENCY_WINDOW = 50  # Most recent samples kept per source
+LATENCY_MIN_SAMPLES = 5
+# A scrape missing a skipped or failed source, and any response built from it,
+# is cached only until that source may have recovered
+DEGRADED_SCRAPE_TTL = 300  # seconds
+
+class SourceHealth:
+    """Circuit breaker and latency window for one upstream source
+
+    closed: requests flow normally. open: the source is skipped until the
+    cooldown elapses. half_open: a single probe request is let through with
+    the full timeout; its outcome closes or re-opens the circuit.
+
+    Timeouts count as latency samples at the budget they ran out, so a
+    source that slows down earns a longer timeout instead of failing forever.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 cooldown=BREAKER_COOLDOWN, max_timeout=SCRAPE_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_timeout = max_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._timeout = max_timeout
+        self._lock = threading.Lock()
+        self.successes = 0
+        self.total_failures = 0
+        self.skipped = 0
+
+    def allow_request(self):
+        """Whether a fetch may go out now; claims the probe when half-open"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                logger.info(f"Circuit half-open for {self.name}")
+                return True
+            self.skipped += 1
+            return False
+
+    def release_probe(self):
+        """Re-open the circuit when a claimed probe never went out"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def record_success(self, latency):
+        with self._lock:
+            self.successes += 1
+            self._failures = 0
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit closed for {self.name}")
+            self.state = self.CLOSED
+            self._latencies.append(latency)
+            self._timeout = self._compute_timeout()
+
+    def record_failure(self, timed_out_after=None):
+        with self._lock:
+            self.total_failures += 1
+            self._failures += 1
+            if timed_out_after is not None:
+                self._latencies.append(timed_out_after)
+                self._timeout = self._compute_timeout()
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self._failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                logger.warning(f"Circuit open for {self.name} after {self._failures} failures")
+
+    def timeout(self):
+        """Read timeout for the next request to this source"""
+        if self.state == self.HALF_OPEN:
+            return self.max_timeout
+        return self._timeout
+
+    def _compute_timeout(self):
+        if len(self._latencies) < LATENCY_MIN_SAMPLES:
+            return self.max_timeout
+        ordered = sorted(self._latencies)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return min(self.max_timeout, max(ADAPTIVE_TIMEOUT_MIN, p95 * ADAPTIVE_TIMEOUT_FACTOR))
+
+    def stats(self):
+        with self._lock:
+            ordered = sorted(self._latencies)
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "successes": self.successes,
+                "failures": self.total_failures,
+                "skipped": self.skipped,
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000) if ordered else None,
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000) if ordered else None,
+                "timeout_s": round(self._timeout, 3)
+            }
+
+_source_health = {}
+_source_health_lock = threading.Lock()
+
+def source_health(source_name):
+    """Return the health tracker for a source, creating it on first use"""
+    with _source_health_lock:
+        health = _source_health.get(source_name)
+        if health is None:
+            health = _source_health[source_name] = SourceHealth(source_name)
+        return health
+
+# ETag/Last-Modified per search URL, kept well beyond CACHE_DURATION so expired
+# scrape entries can be revalidated with a conditional request
+VALIDATOR_TTL = timedelta(days=7)
+validator_cache = TTLCache('validator_cache', ttl=VALIDATOR_TTL, max_entries=20000,
+                           max_bytes=32 * 1024 * 1024)
+
+def load_validators(url):
+    """Stored {"etag", "last_modified", "content"} for url, or None"""
+    key = hashlib.md5(url.encode()).hexdigest()
+    entry = validator_cache.get(key)
+    if entry is None and disk_cache is not None:
+        entry, remaining = disk_cache.load(f'validators:{key}')
+        if entry is not None and remaining > 0:
+            validator_cache.set(key, entry, ttl=remaining)
+        else:
+            entry = None
+    return entry
+
+def save_validators(url, entry):
+    key = hashlib.md5(url.encode()).hexdigest()
+    validator_cache.set(key, entry)
+    if disk_cache is not None:
+        disk_cache.store(f'validators:{key}', entry, validator_cache.ttl)
+
+class SourceUnavailable(Exception):
+    """A source failed or timed out; already logged and counted against its breaker"""
+
+def shared_scrape_ttl(scraped_data, max_sources):
+    """Cache lifetime for a scrape read from the shared backend
+
+    The backend doesn't record whether the scrape was degraded, so a result
+    with fewer sources than were asked for is treated as if it were.
+    """
+    expected = min(max_sources, len(MEDICAL_SOURCES))
+    return scrape_cache.ttl if len(scraped_data) >= expected else DEGRADED_SCRAPE_TTL
+
+def declared_charset(response):
+    """Charset named in the Content-Type header, or None if absent or unknown"""
+    # requests assumes ISO-8859-1 for text/html without one, which would
+    # override a UTF-8 <meta> tag in the page
+    if 'charset=' not in response.headers.get('Content-Type', '').lower():
+        return None
+    try:
+        return codecs.lookup(response.encoding).name
+    except LookupError:
+        return None
+
+def fetch_source(source_name, source_config, query):
+    """Fetch and extract paragraphs from a single medical source"""
+    search_url = source_config["search_url"] + quote_plus(query)
+    host = urlparse(source_config["base_url"]).netloc
+    health = source_health(source_name)
+    read_timeout = health.timeout()
+
+    try:
+        headers = dict(SCRAPE_HEADERS, **{'User-Agent': source_config["user_agent"]})
+
+        # Revalidate instead of refetching when we hold validators for this URL
+        validators = load_validators(search_url)
+        if validators:
+            if validators.get("etag"):
+                headers['If-None-Match'] = validators["etag"]
+            if validators.get("last_modified"):
+                headers['If-Modified-Since'] = validators["last_modified"]
+
+        # Connect timeout stays fixed; the read timeout tracks this source's latency
+        started = time.monotonic()
+        response = get_session(host).get(
+            search_url, headers=headers, timeout=(SCRAPE_TIMEOUT, read_timeout)
+        )
+
+        if response.status_code == 304 and validators:
+            logger.info(f"Not modified: {source_name}")
+            clean_text = validators["content"]
+            save_validators(search_url, validators)  # Restart the validator TTL
+        else:
             response.raise_for_status()
             
-            # Parse HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove ads and scripts
-            for element in soup(['script', 'style', 'iframe', 'nav', 'footer', 'aside']):
-                element.decompose()
-            
-            # Extract clean text
-            paragraphs = soup.find_all('p', limit=10)
-            clean_text = []
+            # Extract clean text, stopping as soon as enough paragraphs are found
+            clean_text = extractor_for(source_name).extract(response.content, declared_charset(response))
             
-            for p in paragraphs:
-                text = p.get_text().strip()
-                # Filter out short or irrelevant paragraphs
-                if len(text) > 50 and not re.search(r'cookie|privacy|advertisement', text, re.IGNORECASE):
-                    clean_text.append(text)
-            
-            if clean_text:
-                scraped_data.append({
-                    "source": source_name.upper(),
-                    "priority": source_config["priority"],
-                    "content": clean_text[:5],  # Top 5 paragraphs
-                    "url": search_url
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag or last_modified:
+                save_validators(search_url, {
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "content": clean_text
                 })
-                
-            logger.info(f"Successfully scraped {source_name}")
             
-            # Rate limiting
-            time.sleep(0.5)
-            
-        except requests.Timeout:
-            logger.warning(f"Timeout scraping {source_name}")
-        except requests.RequestException as e:
-            logger.warning(f"Error scraping {source_name}: {str(e)}")
-        except Exception as e:
-            logger.error(f"Unexpected error scraping {source_name}: {str(e)}")
-    
-    # Sort by priority
-    scraped_data.sort(key=lambda x: x['priority'], reverse=True)
-    
-    # Cache results
-    scrape_cache[cache_key] = {
-        'timestamp': datetime.now(),
-        'data': scraped_data
-    }
+            logger.info(f"Successfully scraped {source_name}")
+
+        elapsed = time.monotonic() - started
+        health.record_success(elapsed)
+        source_latency.observe(elapsed, source_name)
+
+        if not clean_text:
+            return None
+
+        return {
+            "source": source_name.upper(),
+            "priority": source_config["priority"],
+            "content": clean_text,  # Top 5 paragraphs
+            "url": search_url
+        }
+        
+    except requests.Timeout:
+        logger.warning(f"Timeout scraping {source_name}")
+        health.record_failure(timed_out_after=read_timeout)
+        upstream_errors.inc(source_name, 'timeout')
+    except requests.RequestException as e:
+        logger.warning(f"Error scraping {source_name}: {str(e)}")
+        health.record_failure()
+        upstream_errors.inc(source_name, 'request')
+    except Exception as e:
+        logger.error(f"Unexpected error scraping {source_name}: {str(e)}")
+        health.record_failure()
+        upstream_errors.inc(source_name, 'unexpected')
+
+    # Raised rather than returning None so the scrape knows it is missing a source
+    raise SourceUnavailable(source_name)
+
+class ScrapeJob:
+    """Tracks one fan-out scrape and caches the full result once it settles"""
+
+    stale = False
+
+    def __init__(self, query, cache_key, futures, lock_token=None, skipped=()):
+        self.query = query
+        self.cache_key = cache_key
+        self.futures = futures
+        self.lock_token = lock_token
+        self.skipped = skipped  # Sources left out because their circuit was open
+        self.done = threading.Event()
+        self._remaining = len(futures)
+        self._lock = threading.Lock()
+        if not futures:
+            self._finish()
+        for future in futures:
+            future.add_done_callback(self._on_source_done)
+
+    @property
+    def degraded(self):
+        """Whether a source was skipped or has failed, so the result may lack it"""
+        return bool(self.skipped) or any(f.done() and f.exception() is not None for f in self.futures)
+
+    @property
+    def ttl(self):
+        """Seconds the result, and responses built from it, may be cached"""
+        return DEGRADED_SCRAPE_TTL if self.degraded else scrape_cache.ttl
+
+    def _on_source_done(self, future):
+        with self._lock:
+            self._remaining -= 1
+            finished = self._remaining == 0
+        if finished:
+            self._finish()
+
+    def _finish(self):
+        scraped_data = self._collect(self.futures)
+        ttl = self.ttl
+        store_scrape_locally(self.cache_key, scraped_data, ttl)
+        if shared_cache is not None:
+            shared_cache.set(self.cache_key, scraped_data, ttl)
+            if self.lock_token:
+                shared_cache.release_lock(self.cache_key, self.lock_token)
+        with _inflight_lock:
+            if _inflight_scrapes.get(self.cache_key) is self:
+                del _inflight_scrapes[self.cache_key]
+        self.done.set()
+        logger.info(f"Scrape settled for query: {self.query}")
+
+    @staticmethod
+    def _collect(futures):
+        scraped_data = [
+            f.result() for f in futures
+            if f.done() and f.exception() is None and f.result()
+        ]
+        # Sort by priority
+        scraped_data.sort(key=lambda x: x['priority'], reverse=True)
+        return scraped_data
+
+    def wait(self, timeout=None):
+        """Return (sources finished so far, whether every source finished)"""
+        complete = self.done.wait(timeout)
+        return self._collect(self.futures), complete
+
+    async def wait_async(self, timeout=None):
+        """wait() for event loops: suspends on the source futures instead of a thread"""
+        pending = [asyncio.wrap_future(f) for f in self.futures if not f.done()]
+        if pending:
+            # asyncio.wait never cancels what it waits on, so late sources keep running
+            await asyncio.wait(pending, timeout=timeout)
+        return self._collect(self.futures), all(f.done() for f in self.futures)
+
+    def iter_sources(self, timeout=None):
+        """Yield each source's result as soon as that source finishes"""
+        try:
+            for future in as_completed(self.futures, timeout=timeout):
+                if future.exception() is None and future.result():
+                    yield future.result()
+        except FuturesTimeoutError:
+            return
+
+class CachedScrape:
+    """Already-settled scrape served straight from the cache"""
+
+    def __init__(self, data, stale=False, ttl=None):
+        self.data = data
+        self.stale = stale  # Past its TTL; a refresh is running in the background
+        # What is left of the cached scrape's lifetime, which may be a degraded one's
+        self.ttl = scrape_cache.ttl if ttl is None else ttl
+
+    def wait(self, timeout=None):
+        return self.data, True
+
+    async def wait_async(self, timeout=None):
+        return self.data, True
+
+    def iter_sources(self, timeout=None):
+        yield from self.data
+
+class SharedScrapeWait:
+    """Scrape owned by another worker; polls the shared cache for its result"""
+
+    stale = False
+
+    def __init__(self, query, cache_key, max_sources):
+        self.query = query
+        self.cache_key = cache_key
+        self.max_sources = max_sources
+        self.started = time.monotonic()
+        self.ttl = DEGRADED_SCRAPE_TTL  # Until the owner's result arrives
+
+    def wait(self, timeout=None):
+        # Never outwait the owner's lock, after which it is presumed dead
+        deadline = self.started + SHARED_LOCK_TTL
+        if timeout is not None:
+            deadline = min(deadline, time.monotonic() + timeout)
+        while True:
+            scraped_data = shared_cache.get(self.cache_key)
+            if scraped_data is not None:
+                self.ttl = shared_scrape_ttl(scraped_data, self.max_sources)
+                store_scrape_locally(self.cache_key, scraped_data, self.ttl)
+                return scraped_data, True
+            if time.monotonic() >= deadline:
+                return [], False
+            time.sleep(SHARED_POLL_INTERVAL)
+
+    async def wait_async(self, timeout=None):
+        # Polling goes over the network to the shared backend, so keep it off the loop
+        return await asyncio.get_running_loop().run_in_executor(None, self.wait, timeout)
+
+    def iter_sources(self, timeout=None):
+        yield from self.wait(timeout)[0]
+
+_inflight_scrapes = {}
+_inflight_lock = threading.RLock()
+
+def start_scrape(query, max_sources=3):
+    """Start (or join) a background scrape for query and return its job"""
+    cache_key = hashlib.md5(query.encode()).hexdigest()
+    popularity.record(cache_key, query, max_sources)
     
+    # Check cache
+    cached, fresh = scrape_cache.lookup(cache_key)
+    if cached is None and disk_cache is not None:
+        # Fall through to disk, e.g. right after a deploy emptied memory
+        cached, remaining = disk_cache.load(cache_key)
+        if cached is not None:
+            scrape_cache.set(cache_key, cached, ttl=max(remaining, 0))
+            fresh = remaining > 0
+    if cached is not None:
+        if fresh:
+            logger.info(f"Cache hit for query: {query}")
+            return CachedScrape(cached, ttl=scrape_cache.ttl_remaining(cache_key))
+        # Stale-while-revalidate: answer now, refresh off the request path
+        logger.info(f"Serving stale result while revalidating query: {query}")
+        refresh_scrape(query, cache_key, max_sources)
+        return CachedScrape(cached, stale=True)
+
+    # Late sources from an earlier request may still be running
+    with _inflight_lock:
+        job = _inflight_scrapes.get(cache_key)
+        if job is not None:
+            return job
+
+    # Concurrent misses for the same query launch a single scrape
+    return scrape_flight.do(cache_key, lambda: _launch_scrape(query, cache_key, max_sources))
+
+def refresh_scrape(query, cache_key, max_sources=3, skip_shared_lookup=False):
+    """Re-scrape query in the background even though a cached copy exists"""
+    with _inflight_lock:
+        job = _inflight_scrapes.get(cache_key)
+        if job is not None:
+            return job
+    return scrape_flight.do(
+        cache_key, lambda: _launch_scrape(query, cache_key, max_sources, skip_shared_lookup)
+    )
+
+def _launch_scrape(query, cache_key, max_sources, skip_shared_lookup=False):
+    lock_token = None
+    if shared_cache is not None:
+        cached = None if skip_shared_lookup else shared_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Shared cache hit for query: {query}")
+            ttl = shared_scrape_ttl(cached, max_sources)
+            store_scrape_locally(cache_key, cached, ttl)
+            return CachedScrape(cached, ttl=ttl)
+        # Only one worker across the fleet fetches a given query at a time
+        lock_token = shared_cache.acquire_lock(cache_key, SHARED_LOCK_TTL)
+        if lock_token is None:
+            logger.info(f"Waiting on another worker's scrape for query: {query}")
+            return SharedScrapeWait(query, cache_key, max_sources)
+
+    # Fan out to all sources at once; latency is bounded by the slowest one.
+    # Sources with an open circuit are skipped rather than waited out.
+    futures = []
+    skipped = []
+    for source_name, source_config in list(MEDICAL_SOURCES.items())[:max_sources]:
+        health = source_health(source_name)
+        if not health.allow_request():
+            skipped.append(source_name)
+            continue
+        future = host_scheduler.submit(
+            urlparse(source_config["base_url"]).netloc,
+            fetch_source, source_name, source_config, query
+        )
+        if future.done() and isinstance(future.exception(), HostBusy):
+            # Dropped before it ran, so no outcome will ever settle a half-open probe
+            health.release_probe()
+        futures.append(future)
+    if skipped:
+        logger.info(f"Skipping sources with open circuits: {', '.join(skipped)}")
+    with _inflight_lock:
+        job = ScrapeJob(query, cache_key, futures, lock_token, skipped)
+        if not job.done.is_set():
+            _inflight_scrapes[cache_key] = job
+    return job
+
+def scrape_medical_info(query, max_sources=3, deadline=None):
+    """Scrape medical information from trusted sources
+
+    With a deadline (seconds), returns whichever sources finished in time;
+    the rest keep running and land in the scrape cache.
+    """
+    scraped_data, _ = start_scrape(query, max_sources).wait(deadline)
     return scraped_data
 
+# ==================== CACHE WARMING ====================
+WARM_INTERVAL = 60  # Seconds between warmer passes
+WARM_TOP_N = 50  # Most popular queries considered on each pass
+WARM_MAX_PER_PASS = 10  # Cap so warming never crowds out live requests to a host
+WARM_AHEAD = timedelta(minutes=30)  # Refresh hot entries this long before they go stale
+POPULARITY_MAX_KEYS = 10000
+POPULARITY_DECAY = 0.9  # Per-pass multiplier, so popularity reflects recent traffic
+
+class PopularityTracker:
+    """Exponentially decaying request counts per scrape query, bounded in size"""
+
+    def __init__(self, max_keys=POPULARITY_MAX_KEYS, decay=POPULARITY_DECAY):
+        self.max_keys = max_keys
+        self.decay_factor = decay
+        self._scores = {}  # cache key -> [score, query, max_sources]
+        self._lock = threading.Lock()
+
+    def record(self, cache_key, query, max_sources):
+        with self._lock:
+            entry = self._scores.get(cache_key)
+            if entry is None:
+                if len(self._scores) >= self.max_keys:
+                    self._prune()
+                self._scores[cache_key] = [1.0, query, max_sources]
+            else:
+                entry[0] += 1
+
+    def _prune(self):
+        # Drop the colder half so bursts of one-off queries can't grow the table
+        keep = sorted(self._scores.items(), key=lambda item: item[1][0], reverse=True)
+        self._scores = dict(keep[:self.max_keys // 2])
+
+    def hottest(self, n):
+        """Top n as [(cache_key, query, max_sources)], most popular first"""
+        with self._lock:
+            top = heapq.nlargest(n, self._scores.items(), key=lambda item: item[1][0])
+        return [(cache_key, query, max_sources) for cache_key, (_, query, max_sources) in top]
+
+    def decay(self):
+        with self._lock:
+            for cache_key in list(self._scores):
+                entry = self._scores[cache_key]
+                entry[0] *= self.decay_factor
+                if entry[0] < 0.1:
+                    del self._scores[cache_key]
+
+    def __len__(self):
+        return len(self._scores)
+
+class CacheWarmer:
+    """Refreshes the hottest scrape queries shortly before their entries go stale"""
+
+    def __init__(self, tracker, interval=WARM_INTERVAL, top_n=WARM_TOP_N,
+                 max_per_pass=WARM_MAX_PER_PASS, ahead=WARM_AHEAD):
+        self.tracker = tracker
+        self.interval = interval
+        self.top_n = top_n
+        self.max_per_pass = max_per_pass
+        self.ahead = ahead.total_seconds()
+        self.refreshes = 0
+        self._thread = None
+
+    def run_once(self):
+        """One warming pass; returns the number of refreshes started"""
+        started = 0
+        for cache_key, query, max_sources in self.tracker.hottest(self.top_n):
+            if started >= self.max_per_pass:
+                break
+            remaining = scrape_cache.ttl_remaining(cache_key)
+            if remaining is not None and remaining > self.ahead:
+                continue
+            with _inflight_lock:
+                if cache_key in _inflight_scrapes:
+                    continue
+            refresh_scrape(query, cache_key, max_sources, skip_shared_lookup=remaining is not None)
+            started += 1
+        self.refreshes += started
+        self.tracker.decay()
+        if started:
+            logger.info(f"Cache warmer refreshed {started} popular queries")
+        return started
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='cache-warmer', daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Cache warmer pass failed: {str(e)}")
+
+    def stats(self):
+        return {"tracked_queries": len(self.tracker), "refreshes": self.refreshes}
+
+popularity = PopularityTracker()
+cache_warmer = CacheWarmer(popularity)
+cache_warmer.start()
+
 # ==================== AI INSIGHT GENERATOR ====================
-def generate_insights(symptoms, conditions_ranked, emergency_flag, scraped_data):
+def format_source(data):
+    """Public view of a scraped source as returned by the API"""
+    return {
+        "name": data["source"],
+        "url": data["url"],
+        "credibility": data["priority"]
+    }
+
+def generate_insights(symptoms, conditions_ranked, emergency_flag, scraped_data, conditions_data=None):
     """Generate intelligent medical insights"""
+    if conditions_data is None:
+        conditions_data = knowledge_store.current.conditions
     
     if emergency_flag:
         summary = "⚠️ EMERGENCY DETECTED - Based on your symptoms, this could be a medical emergency. Seek immediate medical attention."
@@ -381,24 +2440,18 @@ def generate_insights(symptoms, conditions_ranked, emergency_flag, scraped_data)
         ]
     elif conditions_ranked:
         top_condition = conditions_ranked[0]
-        condition_data = KNOWLEDGE_BASE["conditions_data"][top_condition['name']]
+        condition_data = conditions_data[top_condition['name']]
         recommendations = condition_data.get("recommendations", [])[:4]
     
     # Add prevention tips
     prevention_tips = []
     if conditions_ranked and not emergency_flag:
         top_condition = conditions_ranked[0]
-        condition_data = KNOWLEDGE_BASE["conditions_data"][top_condition['name']]
+        condition_data = conditions_data[top_condition['name']]
         prevention_tips = condition_data.get("prevention", [])[:3]
     
     # Format scraped sources
-    sources = []
-    for data in scraped_data:
-        sources.append({
-            "name": data["source"],
-            "url": data["url"],
-            "credibility": data["priority"]
-        })
+    sources = [format_source(data) for data in scraped_data]
     
     return {
         "summary": summary,
@@ -407,25 +2460,591 @@ def generate_insights(symptoms, conditions_ranked, emergency_flag, scraped_data)
         "sources": sources[:3]  # Top 3 sources
     }
 
+# ==================== RESPONSE ENCODING ====================
+GZIP_LEVEL = 6
+# Stands in for the timestamp while encoding, so it can be spliced in per request
+TIMESTAMP_PLACEHOLDER = '@@medintel-timestamp@@'
+_TIMESTAMP_MARKER = f'"{TIMESTAMP_PLACEHOLDER}"'.encode()
+# Fixed gzip member header: deflate, no flags, no mtime, unknown OS
+_GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+def dumps_json(obj):
+    """Compact JSON bytes with sorted keys, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
+
+class EncodedResponse:
+    """An API response encoded once, as JSON and gzip, around its timestamp
+
+    The body is split at the timestamp value, so serving it with the current
+    time is a byte join. The gzip form deflates everything before the
+    timestamp up front, sync-flushed to a byte boundary; each request appends
+    the timestamp and the few bytes after it as a stored block, plus a CRC
+    extended from the precomputed one. Nothing is re-serialized or
+    re-compressed on a hit.
+    """
+
+    __slots__ = ('data', 'prefix', 'suffix', 'size', '_gzip_head', '_crc')
+
+    def __init__(self, data):
+        self.data = data
+        body = dumps_json(dict(data, timestamp=TIMESTAMP_PLACEHOLDER))
+        self.prefix, _, self.suffix = body.partition(_TIMESTAMP_MARKER)
+
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self._gzip_head = _GZIP_HEADER + compressor.compress(self.prefix) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        self._crc = zlib.crc32(self.prefix)
+        self.size = 2 * len(body) + len(self._gzip_head)  # Encoded forms plus the dict kept in data
+
+    def body(self, timestamp):
+        return b''.join((self.prefix, b'"', timestamp.encode(), b'"', self.suffix))
+
+    def gzip_body(self, timestamp):
+        tail = b''.join((b'"', timestamp.encode(), b'"', self.suffix))
+        return b''.join((
+            self._gzip_head,
+            # Final stored block: BFINAL=1, BTYPE=00, then LEN and its complement
+            struct.pack('<BHH', 1, len(tail), len(tail) ^ 0xFFFF),
+            tail,
+            struct.pack('<II', zlib.crc32(tail, self._crc), (len(self.prefix) + len(tail)) & 0xFFFFFFFF)
+        ))
+
+# ==================== ANALYSIS PIPELINE ====================
+def normalize_symptoms(clean_input, kb):
+    """(canonical symptoms in vocabulary order, emergency flag) for sanitized text, memoized"""
+    key = f'{kb.digest[:16]}:{clean_input}'
+    normalized = normalized_cache.get(key)
+    if normalized is None:
+        with stage_latency.time('process_symptoms'):
+            detected_symptoms, emergency_flag = kb.matcher.match(clean_input)
+        normalized = (tuple(detected_symptoms), emergency_flag)
+        normalized_cache.set(key, normalized)
+    return list(normalized[0]), normalized[1]
+
+def analysis_cache_key(clean_input, kb):
+    """query_cache key for sanitized text
+
+    The analysis is a function of the detected symptom set and emergency flag
+    alone, so inputs that normalize the same way share a key.
+    """
+    detected_symptoms, emergency_flag = normalize_symptoms(clean_input, kb)
+    canonical = '|'.join(sorted(detected_symptoms))
+    return hashlib.md5(f'{kb.digest}:{int(emergency_flag)}:{canonical}'.encode()).hexdigest()
+
+def analyze_locally(clean_input, kb):
+    """Symptom detection and condition ranking; needs no network access"""
+    # Process symptoms
+    detected_symptoms, emergency_flag = normalize_symptoms(clean_input, kb)
+    
+    # Match conditions via the inverted index, keeping the top 5 by match percentage
+    with stage_latency.time('scoring'):
+        condition_scores = kb.index.score(detected_symptoms)
+        conditions_ranked = []
+        for condition_name, score in kb.index.top(condition_scores, 5):
+            conditions_ranked.append({
+                "name": condition_name,
+                "match_percentage": score,
+                "severity": get_severity_level(score),
+                **kb.fragments[condition_name]["ranked"]
+            })
+    
+    # Override emergency if condition flagged
+    if conditions_ranked and conditions_ranked[0]['is_emergency']:
+        emergency_flag = True
+
+    return {
+        "detected_symptoms": detected_symptoms,
+        "emergency_flag": emergency_flag,
+        "conditions_ranked": conditions_ranked,
+        "conditions_found": len(condition_scores)
+    }
+
+def scrape_query_for(detected_symptoms):
+    """Search query used to enrich an analysis, or None if nothing was detected"""
+    if not detected_symptoms:
+        return None
+    # Symptoms arrive in vocabulary order, so the same set always yields the same query
+    return ' '.join(detected_symptoms[:3])  # Top 3 symptoms
+
+def build_response(local, scraped_data, enrichment_complete, kb):
+    """Combine local analysis and scraped sources into the API response"""
+    conditions_ranked = local["conditions_ranked"]
+    
+    # Generate insights (fragments carry recommendations/prevention already truncated)
+    with stage_latency.time('insights'):
+        insights = generate_insights(
+            local["detected_symptoms"],
+            conditions_ranked[:5],  # Top 5 conditions
+            local["emergency_flag"],
+            scraped_data,
+            kb.fragments
+        )
+    
+    return {
+        "summary": insights["summary"],
+        "possible_conditions": conditions_ranked[:5],
+        "severity_level": conditions_ranked[0]["severity"] if conditions_ranked else "Unknown",
+        "recommendations": insights["recommendations"],
+        "prevention": insights["prevention"],
+        "emergency_flag": local["emergency_flag"],
+        "sources": insights["sources"],
+        "detected_symptoms": local["detected_symptoms"],
+        "enrichment_complete": enrichment_complete,
+        "timestamp": datetime.now().isoformat()
+    }
+
+def begin_analysis(clean_input):
+    """Local analysis plus the scrape job enriching it (None if nothing to search)"""
+    # One snapshot per request, so a concurrent reload can't mix knowledge bases
+    kb = knowledge_store.current
+    local = analyze_locally(clean_input, kb)
+    search_query = scrape_query_for(local["detected_symptoms"])
+    scrape_job = start_scrape(search_query, max_sources=3) if search_query else None
+    return kb, local, scrape_job
+
+def finish_analysis(cache_key, kb, local, scrape_job, scraped_data, enrichment_complete):
+    """Build and encode the response from whatever enrichment arrived; cache it if whole"""
+    if not enrichment_complete:
+        logger.info(f"Enrichment deadline hit, returning {len(scraped_data)} source(s)")
+    
+    response = build_response(local, scraped_data, enrichment_complete, kb)
+    with stage_latency.time('serialization'):
+        encoded = EncodedResponse(response)
+    
+    # Cache response (partial or stale sources would otherwise be pinned for CACHE_DURATION);
+    # it lives no longer than the scrape it was built from, which is short if degraded
+    if scrape_job is None:
+        query_cache.set(cache_key, encoded)
+    elif enrichment_complete and not scrape_job.stale:
+        query_cache.set(cache_key, encoded, ttl=scrape_job.ttl)
+    
+    logger.info(f"Analysis complete. Emergency: {response['emergency_flag']}, Conditions found: {local['conditions_found']}")
+
+    return encoded
+
+def run_analysis(clean_input, cache_key):
+    """Run the full analysis pipeline for sanitized input; returns its cached EncodedResponse"""
+    kb, local, scrape_job = begin_analysis(clean_input)
+    
+    # Scrape medical info (enrichment bounded by ENRICHMENT_DEADLINE)
+    scraped_data = []
+    enrichment_complete = True
+    if scrape_job is not None:
+        with stage_latency.time('enrichment'):
+            scraped_data, enrichment_complete = scrape_job.wait(ENRICHMENT_DEADLINE)
+    
+    return finish_analysis(cache_key, kb, local, scrape_job, scraped_data, enrichment_complete)
+
+async def run_analysis_async(clean_input, cache_key):
+    """run_analysis for event loops: awaits enrichment without holding a thread"""
+    if shared_cache is None and disk_cache is None:
+        kb, local, scrape_job = begin_analysis(clean_input)
+    else:
+        # Starting a scrape may query SQLite or take the shared backend's lock over the network
+        kb, local, scrape_job = await asyncio.get_running_loop().run_in_executor(
+            None, begin_analysis, clean_input
+        )
+    
+    scraped_data = []
+    enrichment_complete = True
+    if scrape_job is not None:
+        with stage_latency.time('enrichment'):
+            scraped_data, enrichment_complete = await scrape_job.wait_async(ENRICHMENT_DEADLINE)
+    
+    return finish_analysis(cache_key, kb, local, scrape_job, scraped_data, enrichment_complete)
+
+# ==================== BATCH ANALYSIS ====================
+BATCH_MAX_INPUTS = 1000
+BATCH_SCRAPE_WINDOW = 32  # Unique scrape queries in flight at once per batch
+
+def analyze_batch(inputs, client=None):
+    """Analyze many symptom strings, yielding (index, result) as results are ready
+
+    Inputs are sanitized and deduplicated by their canonical symptom set first;
+    the local pipeline runs once per distinct set and each unique search query
+    is scraped once, no matter how many inputs share it. Invalid inputs yield
+    {"error": ...}.
+
+    With a client, each unique search query is charged to its rate limit as
+    one /analyze request would be; queries past the limit are answered from
+    the local analysis alone, with enrichment_complete false.
+    """
+    kb = knowledge_store.current
+    by_key = OrderedDict()  # cache key -> [clean text, input indexes]
+    for index, raw_input in enumerate(inputs):
+        clean_input = sanitize_input(raw_input)
+        if not clean_input:
+            yield index, {"error": "Invalid input provided."}
+            continue
+        by_key.setdefault(analysis_cache_key(clean_input, kb), [clean_input, []])[1].append(index)
+
+    by_query = OrderedDict()  # search query -> [(cache key, local analysis, indexes)]
+    for cache_key, (clean_input, indexes) in by_key.items():
+        cached = query_cache.get(cache_key)
+        if cached is not None:
+            for index in indexes:
+                yield index, cached.data
+            continue
+
+        local = analyze_locally(clean_input, kb)
+        search_query = scrape_query_for(local["detected_symptoms"])
+        if search_query is None:
+            response = build_response(local, [], True, kb)
+            query_cache.set(cache_key, EncodedResponse(response))
+            for index in indexes:
+                yield index, response
+            continue
+        by_query.setdefault(search_query, []).append((cache_key, local, indexes))
+
+    logger.info(f"Batch: {len(inputs)} inputs, {len(by_key)} unique, {len(by_query)} scrape queries")
+
+    if client is not None and by_query:
+        granted = rate_limiter.take(client, len(by_query))
+        if granted < len(by_query):
+            logger.warning(f"Batch from {client} over rate limit: scraping {granted} of {len(by_query)} queries")
+            over_limit = list(by_query.items())[granted:]
+            for search_query, members in over_limit:
+                del by_query[search_query]
+                for cache_key, local, indexes in members:
+                    response = build_response(local, [], False, kb)
+                    for index in indexes:
+                        yield index, response
+
+    # Keep a bounded window of scrapes running and emit groups in order as they settle
+    pending = deque()
+    queries = iter(by_query.items())
+    while True:
+        while len(pending) < BATCH_SCRAPE_WINDOW:
+            item = next(queries, None)
+            if item is None:
+                break
+            search_query, members = item
+            pending.append((start_scrape(search_query, max_sources=3), members))
+        if not pending:
+            break
+
+        scrape_job, members = pending.popleft()
+        scraped_data, enrichment_complete = scrape_job.wait()
+        for cache_key, local, indexes in members:
+            response = build_response(local, scraped_data, enrichment_complete, kb)
+            if enrichment_complete and not scrape_job.stale:
+                query_cache.set(cache_key, EncodedResponse(response), ttl=scrape_job.ttl)
+            for index in indexes:
+                yield index, response
+
+# ==================== STATIC ASSETS ====================
+ASSET_TYPES = {
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'text/javascript; charset=utf-8'
+}
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'  # Fingerprinted URLs never change content
+PAGE_CACHE_CONTROL = 'no-cache'  # Pages keep their URL, so browsers revalidate with If-None-Match
+ASSET_GZIP_LEVEL = 9  # Compressed once at startup, so the slowest settings are free
+ASSET_BROTLI_QUALITY = 11
+
+# Strings pass through untouched; comments and runs of whitespace are what get removed
+_CSS_LEXEMES = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|([^"'/]+|/)""", re.S)
+_CSS_PUNCTUATION_SPACE = re.compile(r'\s*([{};,>])\s*')
+
+def minify_css(source):
+    """Drop comments (keeping /*! notices) and whitespace the CSS grammar doesn't need"""
+    def strip_comments(match):
+        string, comment, code = match.groups()
+        if comment is not None:
+            return comment if comment.startswith('/*!') else ' '
+        return string if string is not None else code
+
+    def collapse(match):
+        string, comment, code = match.groups()
+        if code is None:
+            return string if string is not None else comment
+        code = _CSS_PUNCTUATION_SPACE.sub(r'\1', re.sub(r'\s+', ' ', code))
+        return re.sub(r':\s+', ':', code).replace(';}', '}')
+
+    css = _CSS_LEXEMES.sub(collapse, _CSS_LEXEMES.sub(strip_comments, source))
+    return css.replace(';}', '}').strip()
+
+def minify_js(source):
+    """Strip indentation, trailing whitespace and blank lines
+
+    Line breaks are kept, so automatic semicolon insertion is unaffected.
+    Lines inside template literals or after a backslash continuation are
+    left exactly as written.
+    """
+    lines = []
+    in_template = False
+    continued = False
+    for line in source.splitlines():
+        if in_template or continued:
+            lines.append(line)
+        elif line.strip():
+            lines.append(line.strip())
+        if len(re.findall(r'(?<!\\)`', line)) % 2:
+            in_template = not in_template
+        continued = line.endswith('\\')
+    return '\n'.join(lines) + '\n'
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+class PrecompressedBody:
+    """A response body encoded once, as-is and as gzip/brotli, with a content ETag"""
+
+    __slots__ = ('content_type', 'etag', 'variants')
+
+    def __init__(self, body, content_type):
+        self.content_type = content_type
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {'identity': body}
+        compressed = gzip.compress(body, compresslevel=ASSET_GZIP_LEVEL, mtime=0)
+        if len(compressed) < len(body):
+            self.variants['gzip'] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(body, mode=brotli.MODE_TEXT, quality=ASSET_BROTLI_QUALITY)
+            if len(compressed) < len(body):
+                self.variants['br'] = compressed
+
+    def negotiate(self, accept_encodings):
+        """(encoding, body) for the smallest variant the client accepts"""
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accept_encodings[encoding] > 0:
+                return encoding, self.variants[encoding]
+        return 'identity', self.variants['identity']
+
+    def respond(self, cache_control):
+        """Response for the current request, 304 when its If-None-Match still matches"""
+        encoding, body = self.negotiate(request.accept_encodings)
+        response = Response(body, content_type=self.content_type)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = cache_control
+        # Each encoding is different bytes, so each gets its own strong ETag
+        response.set_etag(self.etag if encoding == 'identity' else f'{self.etag}-{encoding}')
+        return response.make_conditional(request)
+
+class StaticAsset(PrecompressedBody):
+    __slots__ = ('source', 'name', 'original_size')
+
+    def __init__(self, source, body, original_size):
+        stem, ext = os.path.splitext(source)
+        super().__init__(body, ASSET_TYPES[ext])
+        self.source = source
+        self.name = f'{stem}.{self.etag[:12]}{ext}'
+        self.original_size = original_size
+
+class AssetBundle:
+    """Minified, fingerprinted copies of the static files, built at startup
+
+    Each file is served from memory under a name containing its content hash,
+    so it can be cached by browsers and CDNs forever; a changed file gets a
+    new name on the next start. Templates link to them through asset_url().
+    """
+
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        self._by_source = {}
+        self._by_name = {}
+
+    @classmethod
+    def build(cls, static_dir):
+        bundle = cls(static_dir)
+        if static_dir is None or not os.path.isdir(static_dir):
+            return bundle
+        for root, _, files in os.walk(static_dir):
+            for filename in sorted(files):
+                ext = os.path.splitext(filename)[1]
+                if ext not in ASSET_TYPES:
+                    continue
+                path = os.path.join(root, filename)
+                source = os.path.relpath(path, static_dir).replace(os.sep, '/')
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        original = f.read()
+                except (OSError, UnicodeDecodeError) as e:
+                    # Still reachable unminified through the plain /static route
+                    logger.warning(f"Skipping static asset {source}: {str(e)}")
+                    continue
+                asset = StaticAsset(source, MINIFIERS[ext](original).encode('utf-8'),
+                                    len(original.encode('utf-8')))
+                bundle._by_source[source] = asset
+                bundle._by_name[asset.name] = asset
+
+        stats = bundle.stats()
+        logger.info(
+            f"Built {stats['files']} static assets: {stats['original_bytes']} bytes, "
+            f"{stats['minified_bytes']} minified, {stats['gzip_bytes']} gzip, {stats['brotli_bytes']} brotli"
+        )
+        return bundle
+
+    def get(self, name):
+        return self._by_name.get(name)
+
+    def url(self, filename):
+        asset = self._by_source.get(filename)
+        # The debug server serves the files as edited, without a restart
+        if asset is None or app.debug:
+            return url_for('static', filename=filename)
+        return url_for('static_asset', name=asset.name)
+
+    def stats(self):
+        assets = list(self._by_source.values())
+        return {
+            "files": len(assets),
+            "original_bytes": sum(asset.original_size for asset in assets),
+            "minified_bytes": sum(len(asset.variants['identity']) for asset in assets),
+            "gzip_bytes": sum(len(asset.variants.get('gzip', b'')) for asset in assets),
+            "brotli_bytes": sum(len(asset.variants.get('br', b'')) for asset in assets),
+            "brotli_available": brotli is not None
+        }
+
+class PageCache:
+    """Rendered templates held as precompressed bytes
+
+    Pages are rendered once per template and script root (the prefix their
+    links are built with), except in debug mode where every request renders.
+    Concurrent first renders produce the same bytes, so no lock is needed.
+    """
+
+    def __init__(self):
+        self._pages = {}
+
+    def get(self, template):
+        key = (template, request.script_root)
+        page = self._pages.get(key)
+        if page is None or app.debug:
+            page = PrecompressedBody(render_template(template).encode('utf-8'), 'text/html; charset=utf-8')
+            self._pages[key] = page
+        return page
+
+    def clear(self):
+        self._pages.clear()
+
+    def stats(self):
+        return {"pages": len(self._pages)}
+
+assets = AssetBundle.build(app.static_folder)
+page_cache = PageCache()
+
+@app.template_global()
+def asset_url(filename):
+    """URL of a static file, fingerprinted when it is part of the asset bundle"""
+    return assets.url(filename)
+
 # ==================== API ROUTES ====================
+def rate_limit_response(client_ip):
+    """429 response if client_ip is over its rate limit, otherwise None"""
+    if check_rate_limit(client_ip):
+        return None
+    logger.warning(f"Rate limit exceeded for IP: {client_ip}")
+    return jsonify({
+        "error": "Rate limit exceeded. Please try again in a minute."
+    }), 429
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_endpoint = request.endpoint or 'unmatched'
+    g.metrics_started = time.perf_counter()
+    http_in_flight.inc(g.metrics_endpoint)
+
+@app.after_request
+def count_response(response):
+    http_requests.inc(g.get('metrics_endpoint', 'unmatched'), str(response.status_code))
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    # Runs once the body is sent, so streamed responses are timed end to end
+    started = g.get('metrics_started')
+    if started is not None:
+        http_in_flight.dec(g.metrics_endpoint)
+        http_latency.observe(time.perf_counter() - started, g.metrics_endpoint)
+
+@metrics.register_collector
+def collect_cache_metrics():
+    caches = {"normalized_cache": normalized_cache, "query_cache": query_cache,
+              "scrape_cache": scrape_cache, "validator_cache": validator_cache}
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    lookups = []
+    for name, cache_stats in stats.items():
+        lookups.append(({"cache": name, "result": "hit"}, cache_stats["hits"]))
+        lookups.append(({"cache": name, "result": "stale_hit"}, cache_stats["stale_hits"]))
+        lookups.append(({"cache": name, "result": "miss"}, cache_stats["misses"]))
+    if disk_cache is not None:
+        disk_stats = disk_cache.stats()
+        lookups.append(({"cache": "disk_cache", "result": "hit"}, disk_stats["hits"]))
+        lookups.append(({"cache": "disk_cache", "result": "miss"}, disk_stats["misses"]))
+    return [
+        ('medintel_cache_lookups_total', 'counter', 'Cache lookups by cache and result', lookups),
+        ('medintel_cache_hit_ratio', 'gauge', 'Fresh hits over all lookups since start',
+         [({"cache": name}, cache_stats["hit_ratio"]) for name, cache_stats in stats.items()]),
+        ('medintel_cache_entries', 'gauge', 'Entries held in memory',
+         [({"cache": name}, cache_stats["entries"]) for name, cache_stats in stats.items()]),
+        ('medintel_cache_bytes', 'gauge', 'Approximate bytes held in memory',
+         [({"cache": name}, cache_stats["bytes"]) for name, cache_stats in stats.items()]),
+        ('medintel_cache_evictions_total', 'counter', 'Entries evicted to stay within budget',
+         [({"cache": name}, cache_stats["evictions"]) for name, cache_stats in stats.items()])
+    ]
+
+@metrics.register_collector
+def collect_pipeline_metrics():
+    flights = {"analysis": analysis_flight.stats(), "scrape": scrape_flight.stats()}
+    health = {name: tracker.stats() for name, tracker in list(_source_health.items())}
+    return [
+        ('medintel_scrapes_in_flight', 'gauge', 'Scrape fan-outs with sources still running',
+         [({}, len(_inflight_scrapes))]),
+        ('medintel_coalesced_in_flight', 'gauge', 'Coalesced calls currently executing',
+         [({"flight": name}, flight["in_flight"]) for name, flight in flights.items()]),
+        ('medintel_coalesced_calls_total', 'counter', 'Callers that shared an in-flight result',
+         [({"flight": name}, flight["coalesced"]) for name, flight in flights.items()]),
+        ('medintel_source_circuit_state', 'gauge', 'Circuit breaker state per source (1 for the current state)',
+         [({"source": name, "state": state}, int(stats["state"] == state))
+          for name, stats in health.items()
+          for state in (SourceHealth.CLOSED, SourceHealth.OPEN, SourceHealth.HALF_OPEN)]),
+        ('medintel_source_skipped_total', 'counter', 'Fetches skipped because the circuit was open',
+         [({"source": name}, stats["skipped"]) for name, stats in health.items()]),
+        ('medintel_source_timeout_seconds', 'gauge', 'Current adaptive read timeout per source',
+         [({"source": name}, stats["timeout_s"]) for name, stats in health.items()]),
+        ('medintel_host_fetches_dropped_total', 'counter', 'Source fetches dropped for lack of a politeness slot',
+         [({}, host_scheduler.dropped)]),
+        ('medintel_rate_limited_total', 'counter', 'Requests rejected by the rate limiter',
+         [({}, rate_limiter.rejected)]),
+        ('medintel_knowledge_base_conditions', 'gauge', 'Conditions in the loaded knowledge base',
+         [({}, len(knowledge_store.current.conditions))])
+    ]
+
+def encoded_response(encoded, gzip_ok):
+    """Response for an EncodedResponse stamped with the current time"""
+    timestamp = datetime.now().isoformat()
+    if gzip_ok:
+        response = Response(encoded.gzip_body(timestamp), content_type='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(encoded.body(timestamp), content_type='application/json')
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 @app.route('/')
 def index():
     """Serve main application page"""
-    return render_template('index.html')
+    return page_cache.get('index.html').respond(PAGE_CACHE_CONTROL)
+
+@app.route('/assets/<path:name>')
+def static_asset(name):
+    """Serve a fingerprinted static asset in the best encoding the client accepts"""
+    asset = assets.get(name)
+    if asset is None:
+        abort(404)
+    return asset.respond(ASSET_CACHE_CONTROL)
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
     """Main API endpoint for symptom analysis"""
     try:
-        # Get client IP for rate limiting
-        client_ip = request.remote_addr
-        
         # Check rate limit
-        if not check_rate_limit(client_ip):
-            logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            return jsonify({
-                "error": "Rate limit exceeded. Please try again in a minute."
-            }), 429
+        limited = rate_limit_response(request.remote_addr)
+        if limited:
+            return limited
         
         # Get input
         data = request.get_json()
@@ -435,81 +3054,25 @@ def analyze():
         raw_input = data.get('symptoms', '')
         
         # Validate and sanitize
-        clean_input = sanitize_input(raw_input)
+        with stage_latency.time('sanitize'):
+            clean_input = sanitize_input(raw_input)
         if not clean_input:
             return jsonify({"error": "Invalid input provided."}), 400
         
         logger.info(f"Processing query: {clean_input[:50]}...")
         
-        # Check cache for exact query
-        cache_key = hashlib.md5(clean_input.encode()).hexdigest()
-        if cache_key in query_cache:
-            cache_entry = query_cache[cache_key]
-            if datetime.now() - cache_entry['timestamp'] < CACHE_DURATION:
-                logger.info("Returning cached response")
-                return jsonify(cache_entry['response'])
-        
-        # Process symptoms
-        detected_symptoms, emergency_flag = process_symptoms(clean_input)
-        
-        # Match conditions
-        conditions_ranked = []
-        for condition_name, condition_data in KNOWLEDGE_BASE["conditions_data"].items():
-            score = calculate_risk_score(detected_symptoms, condition_data)
-            
-            if score > 0:
-                conditions_ranked.append({
-                    "name": condition_name,
-                    "match_percentage": score,
-                    "severity": get_severity_level(score),
-                    "symptoms": condition_data["symptoms"],
-                    "risk_factors": condition_data["risk_factors"],
-                    "is_emergency": condition_data["emergency"]
-                })
-        
-        # Sort by match percentage
-        conditions_ranked.sort(key=lambda x: x['match_percentage'], reverse=True)
-        
-        # Override emergency if condition flagged
-        if conditions_ranked and conditions_ranked[0]['is_emergency']:
-            emergency_flag = True
-        
-        # Scrape medical info (non-blocking enrichment)
-        scraped_data = []
-        if detected_symptoms:
-            search_query = ' '.join(detected_symptoms[:3])  # Top 3 symptoms
-            scraped_data = scrape_medical_info(search_query, max_sources=3)
-        
-        # Generate insights
-        insights = generate_insights(
-            detected_symptoms,
-            conditions_ranked[:5],  # Top 5 conditions
-            emergency_flag,
-            scraped_data
-        )
-        
-        # Build response
-        response = {
-            "summary": insights["summary"],
-            "possible_conditions": conditions_ranked[:5],
-            "severity_level": conditions_ranked[0]["severity"] if conditions_ranked else "Unknown",
-            "recommendations": insights["recommendations"],
-            "prevention": insights["prevention"],
-            "emergency_flag": emergency_flag,
-            "sources": insights["sources"],
-            "detected_symptoms": detected_symptoms,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        # Cache response
-        query_cache[cache_key] = {
-            'timestamp': datetime.now(),
-            'response': response
-        }
-        
-        logger.info(f"Analysis complete. Emergency: {emergency_flag}, Conditions found: {len(conditions_ranked)}")
+        # Check cache for any query with the same symptoms
+        cache_key = analysis_cache_key(clean_input, knowledge_store.current)
+        encoded = query_cache.get(cache_key)
+        if encoded is not None:
+            logger.info("Returning cached response")
+        else:
+            # Identical in-flight queries share one pipeline run and one scrape
+            encoded = analysis_flight.do(cache_key, lambda: run_analysis(clean_input, cache_key))
         
-        return jsonify(response)
+        # Stamping the already-encoded body; encoding it is the 'serialization' stage
+        with stage_latency.time('response_body'):
+            return encoded_response(encoded, request.accept_encodings['gzip'] > 0)
         
     except Exception as e:
         logger.error(f"Error in analyze endpoint: {str(e)}")
@@ -518,16 +3081,156 @@ def analyze():
             "emergency_flag": False
         }), 500
 
+# Fields sent in the first streamed event, before any source has been scraped
+STREAM_ANALYSIS_FIELDS = (
+    "summary", "possible_conditions", "severity_level", "recommendations",
+    "prevention", "emergency_flag", "detected_symptoms"
+)
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """Streaming symptom analysis: local results first, then each source as it lands
+
+    Sends NDJSON by default, or Server-Sent Events for Accept: text/event-stream.
+    Events are "analysis" (local ranking and emergency flag), one "source"
+    per scraped source, and a final "complete" carrying the /analyze body.
+    """
+    limited = rate_limit_response(request.remote_addr)
+    if limited:
+        return limited
+
+    data = request.get_json(silent=True)
+    if not data or 'symptoms' not in data:
+        return jsonify({"error": "Invalid request. 'symptoms' field required."}), 400
+
+    clean_input = sanitize_input(data.get('symptoms', ''))
+    if not clean_input:
+        return jsonify({"error": "Invalid input provided."}), 400
+
+    sse = request.accept_mimetypes.best_match(
+        ['application/x-ndjson', 'text/event-stream']
+    ) == 'text/event-stream'
+
+    def event(kind, payload):
+        if sse:
+            return f"event: {kind}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps(dict(payload, type=kind)) + '\n'
+
+    def generate():
+        try:
+            kb = knowledge_store.current
+            cache_key = analysis_cache_key(clean_input, kb)
+            cached = query_cache.get(cache_key)
+            if cached is not None:
+                cached_response = cached.data
+                yield event('analysis', {k: cached_response[k] for k in STREAM_ANALYSIS_FIELDS})
+                for source in cached_response["sources"]:
+                    yield event('source', source)
+                yield event('complete', cached_response)
+                return
+
+            local = analyze_locally(clean_input, kb)
+
+            # Emergency warnings go out before any third-party site is contacted
+            preview = build_response(local, [], False, kb)
+            yield event('analysis', {k: preview[k] for k in STREAM_ANALYSIS_FIELDS})
+
+            scraped_data = []
+            enrichment_complete = True
+            cacheable = True
+            ttl = None
+            search_query = scrape_query_for(local["detected_symptoms"])
+            if search_query:
+                scrape_job = start_scrape(search_query, max_sources=3)
+                for source in scrape_job.iter_sources():
+                    yield event('source', format_source(source))
+                scraped_data, enrichment_complete = scrape_job.wait()
+                cacheable = enrichment_complete and not scrape_job.stale
+                ttl = scrape_job.ttl
+
+            response = build_response(local, scraped_data, enrichment_complete, kb)
+            if cacheable:
+                query_cache.set(cache_key, EncodedResponse(response), ttl=ttl)
+            yield event('complete', response)
+        except Exception as e:
+            logger.error(f"Error in analyze stream: {str(e)}")
+            yield event('error', {
+                "error": "An error occurred processing your request. Please try again."
+            })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream' if sse else 'application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch_endpoint():
+    """Bulk symptom triage, streamed back as NDJSON
+
+    Expects {"symptoms": ["...", ...]}; each output line is one result
+    tagged with the "index" of its input.
+    """
+    limited = rate_limit_response(request.remote_addr)
+    if limited:
+        return limited
+
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('symptoms'), list):
+        return jsonify({"error": "Invalid request. 'symptoms' list required."}), 400
+
+    inputs = data['symptoms']
+    if len(inputs) > BATCH_MAX_INPUTS:
+        return jsonify({"error": f"Batch too large. Maximum is {BATCH_MAX_INPUTS} inputs."}), 413
+
+    def generate():
+        try:
+            for index, result in analyze_batch(inputs, client=request.remote_addr):
+                yield json.dumps(dict(result, index=index)) + '\n'
+        except Exception as e:
+            logger.error(f"Error in batch analysis: {str(e)}")
+            yield json.dumps({"error": "Batch analysis aborted."}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
+    kb = knowledge_store.current
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "cache_size": len(query_cache),
-        "scrape_cache_size": len(scrape_cache)
+        "scrape_cache_size": len(scrape_cache),
+        "caches": {
+            "normalized_cache": normalized_cache.stats(),
+            "query_cache": query_cache.stats(),
+            "scrape_cache": scrape_cache.stats(),
+            "disk_cache": disk_cache.stats() if disk_cache is not None else None,
+            "validator_cache": validator_cache.stats(),
+            "shared_backend": shared_cache.name if shared_cache is not None else None
+        },
+        "knowledge_base": {
+            "version": kb.digest[:12],
+            "conditions": len(kb.conditions),
+            "loaded_at": kb.loaded_at.isoformat()
+        },
+        "sources": {name: health.stats() for name, health in list(_source_health.items())},
+        "static_assets": dict(assets.stats(), **page_cache.stats()),
+        "rate_limiter": rate_limiter.stats(),
+        "host_scheduler": host_scheduler.stats(),
+        "cache_warmer": cache_warmer.stats(),
+        "coalescing": {
+            "analysis": analysis_flight.stats(),
+            "scrape": scrape_flight.stats()
+        }
     })
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of pipeline, cache and upstream metrics"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/sitemap.xml')
 def sitemap():
     """Basic sitemap for SEO"""
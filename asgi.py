@@ -0,0 +1,284 @@
+"""
+MedIntel AI - Production ASGI entry point
+
+POST /analyze is served natively on the event loop: while sources are being
+scraped the request awaits their futures instead of holding a thread, so one
+process can keep hundreds of analyses in flight. Every other route is passed
+to the Flask app on a worker thread.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 4
+    python asgi.py    # same, configured from MEDINTEL_HOST, PORT and MEDINTEL_WORKERS
+
+`python app.py` remains the debug development server.
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from werkzeug.http import parse_accept_header
+
+import app as medintel
+
+flask_app = medintel.app
+logger = medintel.logger
+
+# Threads for the routes still served through Flask; streamed responses hold one for their duration
+WSGI_THREADS = int(os.environ.get('MEDINTEL_WSGI_THREADS', '32'))
+MAX_BODY_BYTES = 64 * 1024  # /analyze bodies; sanitized input is capped at 500 characters anyway
+
+wsgi_executor = ThreadPoolExecutor(max_workers=WSGI_THREADS, thread_name_prefix='wsgi')
+
+class RequestBodyTooLarge(Exception):
+    pass
+
+class ClientDisconnected(Exception):
+    pass
+
+async def read_body(receive, limit=None):
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ClientDisconnected()
+        body += message.get('body', b'')
+        if limit is not None and len(body) > limit:
+            raise RequestBodyTooLarge()
+        if not message.get('more_body'):
+            return bytes(body)
+
+async def send_body(send, status, body, headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            *headers
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def send_json(send, status, payload):
+    # Serialized by Flask's JSON provider so bodies match the jsonify() of the Flask views
+    await send_body(send, status, flask_app.json.response(payload).get_data())
+
+async def send_encoded(send, encoded, gzip_ok):
+    """Send a cached EncodedResponse stamped with the current time, as encoded_response() does"""
+    with medintel.stage_latency.time('response_body'):
+        timestamp = datetime.now().isoformat()
+        if gzip_ok:
+            body = encoded.gzip_body(timestamp)
+            headers = [(b'content-encoding', b'gzip'), (b'vary', b'Accept-Encoding')]
+        else:
+            body = encoded.body(timestamp)
+            headers = [(b'vary', b'Accept-Encoding')]
+    await send_body(send, 200, body, headers)
+
+def accepts_gzip(scope):
+    values = [value.decode('latin-1') for name, value in scope['headers'] if name == b'accept-encoding']
+    return parse_accept_header(','.join(values))['gzip'] > 0
+
+# ---- Native /analyze ----
+_pending_analyses = {}
+
+async def coalesced_analysis(clean_input, cache_key):
+    """Identical analyses in flight on this loop share one pipeline run"""
+    task = _pending_analyses.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(medintel.run_analysis_async(clean_input, cache_key))
+        _pending_analyses[cache_key] = task
+        task.add_done_callback(lambda _: _pending_analyses.pop(cache_key, None))
+    # Shielded so one client disconnecting doesn't cancel the run for the others
+    return await asyncio.shield(task)
+
+async def analyze(scope, receive):
+    """The /analyze view, returning (200, EncodedResponse) or (status, error payload)"""
+    try:
+        client_ip = (scope.get('client') or ('',))[0]
+        if medintel.rate_limiter.backend is None:
+            allowed = medintel.check_rate_limit(client_ip)
+        else:
+            # Shared counters are a SQLite or network round trip; keep them off the loop
+            allowed = await asyncio.get_running_loop().run_in_executor(
+                None, medintel.check_rate_limit, client_ip
+            )
+        if not allowed:
+            logger.warning(f"Rate limit exceeded for IP: {client_ip}")
+            return 429, {"error": "Rate limit exceeded. Please try again in a minute."}
+
+        try:
+            data = json.loads(await read_body(receive, MAX_BODY_BYTES))
+        except RequestBodyTooLarge:
+            return 413, {"error": "Request body too large."}
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or 'symptoms' not in data:
+            return 400, {"error": "Invalid request. 'symptoms' field required."}
+
+        with medintel.stage_latency.time('sanitize'):
+            clean_input = medintel.sanitize_input(data.get('symptoms', ''))
+        if not clean_input:
+            return 400, {"error": "Invalid input provided."}
+
+        logger.info(f"Processing query: {clean_input[:50]}...")
+
+        cache_key = medintel.analysis_cache_key(clean_input, medintel.knowledge_store.current)
+        encoded = medintel.query_cache.get(cache_key)
+        if encoded is not None:
+            logger.info("Returning cached response")
+            return 200, encoded
+
+        return 200, await coalesced_analysis(clean_input, cache_key)
+
+    except ClientDisconnected:
+        raise
+    except Exception as e:
+        logger.error(f"Error in analyze endpoint: {str(e)}")
+        return 500, {
+            "error": "An error occurred processing your request. Please try again.",
+            "emergency_flag": False
+        }
+
+async def serve_analyze(scope, receive, send):
+    started = time.perf_counter()
+    medintel.http_in_flight.inc('analyze')
+    status = 500
+    try:
+        status, payload = await analyze(scope, receive)
+        if status == 200:
+            await send_encoded(send, payload, accepts_gzip(scope))
+        else:
+            await send_json(send, status, payload)
+    except ClientDisconnected:
+        status = 499  # Client closed the connection before we answered
+    finally:
+        medintel.http_in_flight.dec('analyze')
+        medintel.http_requests.inc('analyze', str(status))
+        medintel.http_latency.observe(time.perf_counter() - started, 'analyze')
+
+# ---- Everything else through Flask ----
+def build_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name != 'CONTENT_TYPE':
+            name = 'HTTP_' + name
+        environ[name] = f'{environ[name]},{value}' if name in environ else value
+    # The body is already buffered, so its length is known even for chunked uploads
+    environ['CONTENT_LENGTH'] = str(len(body))
+    environ.pop('HTTP_CONTENT_LENGTH', None)
+    environ.pop('HTTP_TRANSFER_ENCODING', None)
+    return environ
+
+def run_wsgi(loop, environ, send):
+    """Run the Flask app on this thread, relaying its response to the loop
+
+    The whole response is produced on one thread because Flask's request
+    context (kept open by stream_with_context) is bound to the thread that
+    pushed it. Each chunk waits for the send, so slow clients apply
+    backpressure to streamed responses.
+    """
+    response_start = {}
+
+    def send_sync(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and response_start.get('sent'):
+            raise exc_info[1].with_traceback(exc_info[2])
+        response_start['status'] = int(status.split(' ', 1)[0])
+        response_start['headers'] = [
+            (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+        ]
+
+    def send_start():
+        send_sync({
+            'type': 'http.response.start',
+            'status': response_start['status'],
+            'headers': response_start['headers']
+        })
+        response_start['sent'] = True
+
+    result = flask_app(environ, start_response)
+    try:
+        for chunk in result:
+            if not chunk:
+                continue
+            if not response_start.get('sent'):
+                send_start()
+            send_sync({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        if not response_start.get('sent'):
+            send_start()
+        send_sync({'type': 'http.response.body', 'body': b''})
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+
+async def serve_wsgi(scope, receive, send):
+    try:
+        environ = build_environ(scope, await read_body(receive))
+    except ClientDisconnected:
+        return
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(wsgi_executor, run_wsgi, loop, environ, send)
+
+# ---- ASGI application ----
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            wsgi_executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    elif scope['type'] != 'http':
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+    elif scope['method'] == 'POST' and scope['path'] == '/analyze':
+        await serve_analyze(scope, receive, send)
+    else:
+        await serve_wsgi(scope, receive, send)
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("uvicorn is required to serve MedIntel AI in production: pip install uvicorn")
+    logger.info("Starting MedIntel AI Health Intelligence Platform (ASGI)...")
+    uvicorn.run(
+        'asgi:application',
+        host=os.environ.get('MEDINTEL_HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', '5000')),
+        workers=int(os.environ.get('MEDINTEL_WORKERS', '1')),
+        proxy_headers=True
+    )
@@ -0,0 +1,9 @@
+"""
+MedIntel AI - Benchmark and load-test suite
+
+    python -m benchmarks.bench_stages   # per-stage micro-benchmarks
+    python -m benchmarks.load_test      # end-to-end /analyze load test
+
+Both accept --save-baseline PATH and --baseline PATH to record results and
+compare a later run against them.
+"""
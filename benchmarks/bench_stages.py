@@ -0,0 +1,138 @@
+"""
+Micro-benchmarks for each /analyze pipeline stage
+
+Runs every stage against synthetic knowledge bases of increasing size:
+
+    python -m benchmarks.bench_stages
+    python -m benchmarks.bench_stages --sizes 10,1000 --iterations 5000
+    python -m benchmarks.bench_stages --baseline benchmarks/baseline-stages.json
+
+Latencies are reported in microseconds per call.
+"""
+
+import argparse
+import gc
+import hashlib
+import json
+import logging
+import pickle
+import time
+import tracemalloc
+
+import app
+from benchmarks import report
+from benchmarks.synthetic import make_knowledge_base, make_symptom_texts
+
+def time_calls(fn, inputs, iterations):
+    """Call fn on inputs round-robin, returning each call's duration"""
+    durations = []
+    perf_counter = time.perf_counter
+    count = len(inputs)
+    for i in range(iterations):
+        item = inputs[i % count]
+        started = perf_counter()
+        fn(item)
+        durations.append(perf_counter() - started)
+    return durations
+
+def legacy_rank(symptoms, conditions):
+    """Original full scan with calculate_risk_score, kept as a reference point"""
+    scores = {
+        name: app.calculate_risk_score(symptoms, data)
+        for name, data in conditions.items()
+    }
+    return sorted(((s, n) for n, s in scores.items() if s > 0), reverse=True)[:5]
+
+def bench_compile(data, repeats):
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+    durations = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        app.KnowledgeBase.compile(data, digest)
+        durations.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    kb = app.KnowledgeBase.compile(data, digest)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    blob = pickle.dumps(kb.to_state(), protocol=pickle.HIGHEST_PROTOCOL)
+    load_durations = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        app.KnowledgeBase.from_state(pickle.loads(blob))
+        load_durations.append(time.perf_counter() - started)
+
+    return kb, {
+        'compile_ms': report.summarize(durations, unit=1e3),
+        'snapshot_load_ms': report.summarize(load_durations, unit=1e3),
+        'memory': {
+            'compiled_kb_mb': round(retained / 2 ** 20, 2),
+            'compile_peak_mb': round(peak / 2 ** 20, 2),
+            'snapshot_mb': round(len(blob) / 2 ** 20, 2)
+        }
+    }
+
+def bench_size(n_conditions, args):
+    data = make_knowledge_base(n_conditions, seed=args.seed)
+    texts = make_symptom_texts(data, args.texts, seed=args.seed)
+    kb, results = bench_compile(data, args.compile_repeats)
+    iterations = args.iterations
+
+    clean_texts = [app.sanitize_input(text) for text in texts]
+    matches = [kb.matcher.match(text) for text in clean_texts]
+    symptom_sets = [symptoms for symptoms, _ in matches]
+    locals_ = [app.analyze_locally(text, kb) for text in clean_texts]
+
+    def score(symptoms):
+        kb.index.top(kb.index.score(symptoms), 5)
+
+    def insights(local):
+        app.generate_insights(
+            local["detected_symptoms"], local["conditions_ranked"],
+            local["emergency_flag"], [], kb.fragments
+        )
+
+    responses = [app.build_response(local, [], True, kb) for local in locals_]
+    encoded = [app.EncodedResponse(response) for response in responses]
+    timestamp = '2025-01-01T00:00:00.000000'
+
+    stages = {
+        'sanitize': time_calls(app.sanitize_input, texts, iterations),
+        'process_symptoms': time_calls(kb.matcher.match, clean_texts, iterations),
+        'scoring': time_calls(score, symptom_sets, iterations),
+        'legacy_scoring': time_calls(lambda s: legacy_rank(s, kb.conditions), symptom_sets,
+                                     max(1, iterations // max(1, n_conditions // 100))),
+        'insights': time_calls(insights, locals_, iterations),
+        'serialization': time_calls(app.EncodedResponse, responses, iterations),
+        'cached_body': time_calls(lambda e: e.body(timestamp), encoded, iterations),
+        'cached_gzip_body': time_calls(lambda e: e.gzip_body(timestamp), encoded, iterations),
+        'analyze_locally': time_calls(lambda t: app.analyze_locally(t, kb), clean_texts, iterations)
+    }
+
+    results['stages_us'] = {name: report.summarize(durations) for name, durations in stages.items()}
+    results['detected_per_text'] = round(sum(map(len, symptom_sets)) / len(symptom_sets), 2)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,1000,10000',
+                        help='comma-separated knowledge base sizes (default 10,1000,10000)')
+    parser.add_argument('--iterations', type=int, default=20000, help='calls timed per stage')
+    parser.add_argument('--texts', type=int, default=500, help='distinct symptom texts per size')
+    parser.add_argument('--compile-repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    report.add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    logging.getLogger(app.__name__).setLevel(logging.WARNING)
+    results = {}
+    for size in (int(s) for s in args.sizes.split(',')):
+        print(f"Benchmarking knowledge base with {size} conditions...", flush=True)
+        results[f'kb_{size}'] = bench_size(size, args)
+    results['peak_rss_mb'] = report.peak_rss_mb()
+    report.finish(results, args)
+
+if __name__ == '__main__':
+    main()
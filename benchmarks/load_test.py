@@ -0,0 +1,149 @@
+"""
+End-to-end load test of POST /analyze
+
+Serves the app in-process on a threaded WSGI server, with MEDICAL_SOURCES
+pointed at a local stub, and drives it with concurrent clients:
+
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --conditions 1000 --latency-ms 200 --failure-rate 0.1
+    python -m benchmarks.load_test --save-baseline benchmarks/baseline-load.json
+
+Cache, shared-backend and knowledge base environment variables
+(MEDINTEL_*) apply as they do in production.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from werkzeug.serving import make_server
+
+import app
+from benchmarks import report
+from benchmarks.stub_sources import StubSourceServer
+from benchmarks.synthetic import make_knowledge_base, make_symptom_texts
+
+def configure_app(args, stub):
+    """Point the app at the stub and lift limits that would skew the run"""
+    app.MEDICAL_SOURCES.clear()
+    app.MEDICAL_SOURCES.update(stub.sources())
+    app.host_scheduler.delay = args.politeness_ms / 1000
+    app.ENRICHMENT_DEADLINE = args.deadline_ms / 1000
+    app.host_scheduler.max_wait = args.deadline_ms / 1000
+    app.rate_limiter.limit = 10 ** 9
+    app.query_cache.clear()
+    app.scrape_cache.clear()
+
+    if args.conditions:
+        data = make_knowledge_base(args.conditions, seed=args.seed)
+        digest = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+        app.knowledge_store.current = app.KnowledgeBase.compile(data, digest)
+    return app.knowledge_store.current.data
+
+def run_clients(base_url, texts, total, concurrency):
+    """Send total requests from concurrency clients; return (latencies, statuses, seconds)"""
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    counter = iter(range(total))
+    local = threading.local()
+
+    def client():
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            started = time.perf_counter()
+            try:
+                status = session.post(f'{base_url}/analyze',
+                                      json={"symptoms": texts[index % len(texts)]},
+                                      timeout=30).status_code
+            except requests.RequestException:
+                status = 'connection_error'
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[str(status)] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    return latencies, statuses, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='total requests to send')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--distinct', type=int, default=200,
+                        help='distinct symptom texts; fewer means more cache hits')
+    parser.add_argument('--conditions', type=int, default=0,
+                        help='synthetic knowledge base size (default: the bundled one)')
+    parser.add_argument('--latency-ms', type=float, default=50, help='mean stub source latency')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of stub requests that 503')
+    parser.add_argument('--deadline-ms', type=float, default=app.ENRICHMENT_DEADLINE * 1000,
+                        help='enrichment deadline applied to /analyze')
+    parser.add_argument('--politeness-ms', type=float, default=0,
+                        help='spacing between requests on each connection to a source (production uses %d)'
+                             % (app.POLITENESS_DELAY * 1000))
+    parser.add_argument('--warmup', type=int, default=50, help='untimed requests sent first')
+    parser.add_argument('--seed', type=int, default=0)
+    report.add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    # Injected upstream failures would otherwise log a warning each
+    logging.getLogger(app.__name__).setLevel(logging.ERROR)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    stub = StubSourceServer(('127.0.0.1', 0), args.latency_ms / 1000,
+                            failure_rate=args.failure_rate, seed=args.seed).start()
+    kb_data = configure_app(args, stub)
+    texts = make_symptom_texts(kb_data, args.distinct, seed=args.seed)
+
+    server = make_server('127.0.0.1', 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='load-test-server', daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    try:
+        if args.warmup:
+            run_clients(base_url, texts, args.warmup, args.concurrency)
+        rss_before = report.rss_mb()
+        print(f"Sending {args.requests} requests with {args.concurrency} clients...", flush=True)
+        latencies, statuses, seconds = run_clients(base_url, texts, args.requests, args.concurrency)
+    finally:
+        server.shutdown()
+        stub.shutdown()
+
+    cache_stats = app.query_cache.stats()
+    results = {
+        'requests_per_sec': round(len(latencies) / seconds, 1),
+        'latency_ms': {
+            'p50': round(report.percentile(latencies, 0.50) * 1000, 2),
+            'p90': round(report.percentile(latencies, 0.90) * 1000, 2),
+            'p99': round(report.percentile(latencies, 0.99) * 1000, 2),
+            'max': round(max(latencies) * 1000, 2)
+        },
+        'statuses': dict(statuses),
+        'upstream': {'requests': stub.requests, 'failures': stub.failures,
+                     'dropped': app.host_scheduler.dropped},
+        'query_cache_hit_ratio': cache_stats['hit_ratio'],
+        'memory_mb': {
+            'rss_before': rss_before,
+            'rss_after': report.rss_mb(),
+            'peak_rss': report.peak_rss_mb()
+        }
+    }
+    report.finish(results, args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Result formatting, memory sampling and baseline comparison
+"""
+
+import json
+import os
+import resource
+import sys
+
+# Metrics where a larger value is an improvement; everything else is a cost
+HIGHER_IS_BETTER = ('ops_per_sec', 'requests_per_sec')
+# Recorded for context but not judged as better or worse
+INFORMATIONAL = ('statuses', 'upstream', 'detected_per_text', 'query_cache_hit_ratio')
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an unsorted list"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def summarize(durations, total_seconds=None, unit=1e6):
+    """p50/p99/mean in microseconds (by default) plus throughput"""
+    total = total_seconds if total_seconds is not None else sum(durations)
+    return {
+        'p50': round(percentile(durations, 0.50) * unit, 2),
+        'p99': round(percentile(durations, 0.99) * unit, 2),
+        'mean': round(sum(durations) / len(durations) * unit, 2) if durations else 0.0,
+        'ops_per_sec': round(len(durations) / total, 1) if total else 0.0
+    }
+
+def rss_mb():
+    """Current resident set size in MiB (Linux), falling back to the peak"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20, 1)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return round(peak / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 1)
+
+def _flatten(results, prefix=''):
+    for key, value in results.items():
+        path = f'{prefix}{key}'
+        if isinstance(value, dict):
+            yield from _flatten(value, path + '.')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+def save_baseline(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Baseline saved to {path}")
+
+def compare_to_baseline(results, path, tolerance):
+    """Print per-metric deltas against a saved run; return the regressed metrics"""
+    with open(path, encoding='utf-8') as f:
+        baseline = dict(_flatten(json.load(f)))
+
+    regressions = []
+    print(f"\nComparison against {path} (tolerance {tolerance:.0%})")
+    for name, value in _flatten(results):
+        previous = baseline.get(name)
+        if not previous or any(part in INFORMATIONAL for part in name.split('.')):
+            continue
+        change = (value - previous) / previous
+        if name.rsplit('.', 1)[-1] in HIGHER_IS_BETTER:
+            regressed = change < -tolerance
+        else:
+            regressed = change > tolerance
+        marker = '  REGRESSION' if regressed else ''
+        print(f"  {name:<60} {previous:>12} -> {value:>12} ({change:+.1%}){marker}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+def add_baseline_arguments(parser):
+    parser.add_argument('--save-baseline', metavar='PATH', help='write results to PATH as JSON')
+    parser.add_argument('--baseline', metavar='PATH', help='compare results against a saved run')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='relative change counted as a regression (default 0.10)')
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help='exit with status 1 if any metric regressed')
+
+def finish(results, args):
+    """Handle the baseline arguments added by add_baseline_arguments"""
+    print(json.dumps(results, indent=2, sort_keys=True))
+    if args.save_baseline:
+        save_baseline(results, args.save_baseline)
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed beyond {args.tolerance:.0%}")
+            if args.fail_on_regression:
+                sys.exit(1)
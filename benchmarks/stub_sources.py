@@ -0,0 +1,100 @@
+"""
+Local stand-in for the medical sources scraped by the app
+
+Serves a search results page per source with configurable latency and
+failure rate. It can run on its own:
+
+    python -m benchmarks.stub_sources --port 8600 --latency-ms 80 --failure-rate 0.05
+"""
+
+import argparse
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PARAGRAPH = (
+    "<p>{source} overview: this condition commonly presents with the symptoms you searched for. "
+    "Most cases resolve with rest and fluids, but persistent or worsening symptoms need review "
+    "by a clinician. Seek urgent care if you notice severe pain or difficulty breathing.</p>"
+)
+
+class StubSourceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.05, jitter=0.5, failure_rate=0.0, seed=None):
+        super().__init__(address, StubSourceHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def plan(self):
+        """(delay, fail) for the next request"""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency * (1 + self.rng.uniform(-self.jitter, self.jitter))
+            fail = self.rng.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        return max(0.0, delay), fail
+
+    def sources(self, names=('mayoclinic', 'webmd', 'nhs')):
+        """MEDICAL_SOURCES-shaped config pointing every source at this server"""
+        host, port = self.server_address[:2]
+        return {
+            name: {
+                "base_url": f"http://{host}:{port}",
+                "search_url": f"http://{host}:{port}/{name}/search?q=",
+                "priority": priority,
+                "user_agent": "MedIntel-Benchmark/1.0"
+            }
+            for name, priority in zip(names, (9, 7, 10))
+        }
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='stub-sources', daemon=True).start()
+        return self
+
+class StubSourceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        delay, fail = self.server.plan()
+        time.sleep(delay)
+        if fail:
+            self._send(503, b'Service Unavailable', 'text/plain')
+            return
+        source = self.path.split('/')[1] or 'source'
+        body = ("<html><body><nav><p>Home | Conditions | A-Z</p></nav><main>"
+                + PARAGRAPH.format(source=source) * 6
+                + "</main></body></html>").encode()
+        self._send(200, body, 'text/html; charset=utf-8')
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubSourceServer((args.host, args.port), args.latency_ms / 1000, failure_rate=args.failure_rate)
+    print(f"Stub sources listening on http://{args.host}:{server.server_address[1]}")
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Synthetic knowledge bases and symptom texts for benchmarking
+
+Generation is seeded, so a given size and seed always produce the same
+knowledge base and the same texts.
+"""
+
+import json
+import os
+import random
+
+BASE_KB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'data', 'knowledge_base.json')
+
+BODY_PARTS = [
+    "head", "neck", "chest", "back", "stomach", "abdomen", "shoulder", "elbow", "wrist",
+    "hand", "finger", "hip", "knee", "ankle", "foot", "toe", "eye", "ear", "nose", "throat",
+    "jaw", "tooth", "gum", "tongue", "lip", "skin", "scalp", "groin", "pelvis", "rib",
+    "spine", "thigh", "calf", "shin", "heel", "arm", "leg", "bladder", "kidney", "liver"
+]
+SENSATIONS = [
+    "pain", "swelling", "stiffness", "numbness", "tingling", "itching", "burning", "cramps",
+    "tenderness", "weakness", "bruising", "redness", "throbbing", "spasms", "discharge",
+    "bleeding", "rash", "lump", "soreness", "aching", "pressure", "twitching", "dryness",
+    "sensitivity", "inflammation"
+]
+SYNONYM_SENSATIONS = {
+    "pain": ["hurts", "ache"],
+    "swelling": ["swollen", "puffy"],
+    "itching": ["itchy"],
+    "numbness": ["numb"],
+    "stiffness": ["stiff"],
+    "bleeding": ["bleeds"],
+    "soreness": ["sore"]
+}
+RISK_FACTORS = [
+    "smoking", "obesity", "diabetes", "family history", "age over 60", "high blood pressure",
+    "sedentary lifestyle", "alcohol use", "poor diet", "stress", "pregnancy", "immunosuppression"
+]
+ADVICE = [
+    "Rest", "Stay hydrated", "Apply ice", "Apply heat", "Take over-the-counter pain relief",
+    "See a doctor if symptoms persist", "Avoid strenuous activity", "Keep the area clean",
+    "Monitor your temperature", "Elevate the affected limb"
+]
+TEMPLATES = [
+    "I have {0} and {1}",
+    "I've had {0} since yesterday, also some {1}",
+    "For the past three days I have been experiencing {0}, {1} and {2}",
+    "My {3} has been bothering me, mostly {0}",
+    "Woke up with {0}. Now there is {1} too and I feel {2}",
+    "{0}",
+    "Since last week: {0}, {1}, {2}. Is this serious?",
+    "I am not sure what is wrong, I just feel off",
+]
+
+def _symptom_vocabulary(base):
+    """Real canonical symptoms first, then body part x sensation combinations"""
+    vocabulary = list(base["symptom_synonyms"])
+    seen = set(vocabulary)
+    for part in BODY_PARTS:
+        for sensation in SENSATIONS:
+            term = f"{part} {sensation}"
+            if term not in seen:
+                seen.add(term)
+                vocabulary.append(term)
+    return vocabulary
+
+def make_knowledge_base(n_conditions, seed=0):
+    """Knowledge base dict with n_conditions synthetic conditions
+
+    The real emergency keywords and synonyms are kept. Generated conditions
+    draw 3-8 symptoms with a skew towards common ones, like real data.
+    """
+    rng = random.Random(seed)
+    with open(BASE_KB_PATH, encoding='utf-8') as f:
+        base = json.load(f)
+
+    vocabulary = _symptom_vocabulary(base)
+    synonyms = {canonical: list(variants) for canonical, variants in base["symptom_synonyms"].items()}
+    for term in vocabulary[len(base["symptom_synonyms"]):]:
+        part, sensation = term.split(' ', 1)
+        if sensation in SYNONYM_SENSATIONS and rng.random() < 0.5:
+            synonyms[term] = [f"{part} {variant}" for variant in SYNONYM_SENSATIONS[sensation]]
+
+    # Zipf-like popularity so a few symptoms appear in many conditions
+    popularity = [1.0 / (rank + 1) ** 0.8 for rank in range(len(vocabulary))]
+
+    conditions = dict(list(base["conditions_data"].items())[:n_conditions])
+    index = 0
+    while len(conditions) < n_conditions:
+        index += 1
+        symptoms = []
+        for symptom in rng.choices(vocabulary, popularity, k=rng.randint(3, 8)):
+            if symptom not in symptoms:
+                symptoms.append(symptom)
+        conditions[f"Synthetic Condition {index}"] = {
+            "symptoms": symptoms,
+            "weights": {symptom: rng.randint(1, 10) for symptom in symptoms},
+            "risk_factors": rng.sample(RISK_FACTORS, 3),
+            "emergency": rng.random() < 0.05,
+            "prevention": rng.sample(ADVICE, 3),
+            "recommendations": rng.sample(ADVICE, 4)
+        }
+
+    return {
+        "emergency_keywords": base["emergency_keywords"],
+        "symptom_synonyms": synonyms,
+        "conditions_data": conditions
+    }
+
+def make_symptom_texts(kb_data, count, seed=0):
+    """Free-text symptom descriptions phrased the way users write them"""
+    rng = random.Random(seed)
+    phrases = []
+    for canonical, variants in kb_data["symptom_synonyms"].items():
+        phrases.append(canonical)
+        phrases.extend(variants)
+    emergencies = kb_data["emergency_keywords"]
+
+    texts = []
+    for _ in range(count):
+        picks = rng.sample(phrases, 3)
+        if rng.random() < 0.03:
+            picks[0] = rng.choice(emergencies)
+        text = rng.choice(TEMPLATES).format(*picks, rng.choice(BODY_PARTS))
+        texts.append(text[0].upper() + text[1:])
+    return texts
@@ -0,0 +1,133 @@
+"""
+Minimal in-process stand-in for a Redis server
+
+Speaks enough RESP2 for RedisCacheBackend: GET, SET (with PX/NX), INCR,
+INCRBY, PEXPIRE, DEL, AUTH, SELECT and the lock release script via EVAL.
+Pass an ssl_context to serve over TLS, as a rediss:// endpoint would.
+"""
+
+import socketserver
+import threading
+import time
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, password=None, ssl_context=None):
+        super().__init__(('127.0.0.1', 0), FakeRedisHandler)
+        self.password = password
+        self.ssl_context = ssl_context
+        self.data = {}  # key bytes -> (value bytes, expires_at or None)
+        self.commands = []
+        self.lock = threading.Lock()
+
+    def url(self, db=0):
+        scheme = 'redis' if self.ssl_context is None else 'rediss'
+        auth = f':{self.password}@' if self.password else ''
+        return f'{scheme}://{auth}localhost:{self.server_address[1]}/{db}'
+
+    def get_request(self):
+        sock, address = super().get_request()
+        if self.ssl_context is not None:
+            sock = self.ssl_context.wrap_socket(sock, server_side=True)
+        return sock, address
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, args=(0.05,), name='fake-redis', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def live(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.data[key]
+            entry = None
+        return entry
+
+    def execute(self, name, args, authenticated):
+        if name == 'AUTH':
+            if self.password is not None and args == [self.password.encode()]:
+                return 'ok', None
+            return 'error', 'WRONGPASS invalid password'
+        if self.password is not None and not authenticated:
+            return 'error', 'NOAUTH Authentication required.'
+        with self.lock:
+            self.commands.append(name)
+            if name == 'SELECT':
+                return 'ok', None
+            if name == 'GET':
+                entry = self.live(args[0])
+                return 'bulk', None if entry is None else entry[0]
+            if name == 'SET':
+                key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+                if b'NX' in options and self.live(key) is not None:
+                    return 'bulk', None
+                expires_at = None
+                if b'PX' in options:
+                    expires_at = time.monotonic() + int(args[2 + options.index(b'PX') + 1]) / 1000
+                self.data[key] = (value, expires_at)
+                return 'ok', None
+            if name in ('INCR', 'INCRBY'):
+                entry = self.live(args[0])
+                value = int(entry[0] if entry else 0) + (int(args[1]) if name == 'INCRBY' else 1)
+                self.data[args[0]] = (str(value).encode(), entry[1] if entry else None)
+                return 'int', value
+            if name == 'PEXPIRE':
+                entry = self.live(args[0])
+                if entry is None:
+                    return 'int', 0
+                self.data[args[0]] = (entry[0], time.monotonic() + int(args[1]) / 1000)
+                return 'int', 1
+            if name == 'DEL':
+                return 'int', int(self.data.pop(args[0], None) is not None)
+            if name == 'EVAL':
+                # Only the compare-and-delete script used to release locks
+                key, token = args[2], args[3]
+                entry = self.live(key)
+                if entry is not None and entry[0] == token:
+                    del self.data[key]
+                    return 'int', 1
+                return 'int', 0
+        return 'error', f'ERR unknown command {name}'
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        authenticated = False
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            name = args[0].decode().upper()
+            kind, value = self.server.execute(name, args[1:], authenticated)
+            if name == 'AUTH' and kind == 'ok':
+                authenticated = True
+            self.wfile.write(self.encode(kind, value))
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    @staticmethod
+    def encode(kind, value):
+        if kind == 'ok':
+            return b'+OK\r\n'
+        if kind == 'error':
+            return b'-' + value.encode() + b'\r\n'
+        if kind == 'int':
+            return b':%d\r\n' % value
+        if value is None:
+            return b'$-1\r\n'
+        if isinstance(value, str):
+            value = value.encode()
+        return b'$%d\r\n%s\r\n' % (len(value), value)
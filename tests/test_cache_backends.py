@@ -0,0 +1,113 @@
+import ssl
+import subprocess
+import time
+
+import pytest
+
+import app
+from tests.fake_redis import FakeRedisServer
+
+@pytest.fixture
+def redis_server():
+    server = FakeRedisServer(password='s3cret').start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def backend(redis_server):
+    return app.create_cache_backend(redis_server.url(db=2))
+
+def test_get_and_set_round_trip_json(backend):
+    assert backend.get('missing') is None
+    backend.set('scrape', [{"source": "NHS", "content": ["text"]}], ttl=60)
+    assert backend.get('scrape') == [{"source": "NHS", "content": ["text"]}]
+
+def test_set_expires_after_ttl(backend):
+    backend.set('short', {"a": 1}, ttl=0.05)
+    time.sleep(0.1)
+    assert backend.get('short') is None
+
+def test_authenticates_and_selects_db(backend, redis_server):
+    backend.set('k', 1, ttl=60)
+    assert redis_server.commands[:2] == ['SELECT', 'SET']
+
+def test_lock_is_exclusive_until_released(backend):
+    token = backend.acquire_lock('query', ttl=5)
+    assert token is not None
+    assert backend.acquire_lock('query', ttl=5) is None
+    backend.release_lock('query', 'someone-else')
+    assert backend.acquire_lock('query', ttl=5) is None
+    backend.release_lock('query', token)
+    assert backend.acquire_lock('query', ttl=5) is not None
+
+def test_lock_expires(backend):
+    assert backend.acquire_lock('query', ttl=0.05) is not None
+    time.sleep(0.1)
+    assert backend.acquire_lock('query', ttl=5) is not None
+
+def test_incr_counts_and_expires(backend):
+    assert backend.get_counter('hits') == 0
+    assert backend.incr('hits', ttl=60) == 1
+    assert backend.incr('hits', ttl=60, amount=4) == 5
+    assert backend.get_counter('hits') == 5
+    assert backend.incr('brief', ttl=0.05) == 1
+    time.sleep(0.1)
+    assert backend.get_counter('brief') == 0
+
+def test_shared_rate_limiter(backend):
+    limiter = app.SlidingWindowRateLimiter(3, backend=backend, sweep_interval=0)
+    assert [limiter.allow('client') for _ in range(4)] == [True, True, True, False]
+
+def test_reconnects_after_server_drops_connection(backend, redis_server):
+    backend.set('k', 1, ttl=60)
+    backend._local.sock.close()
+    backend._local.reader.close()
+    assert backend.get('k') == 1
+
+def test_unreachable_server_is_a_miss():
+    server = FakeRedisServer().start()
+    url = server.url()
+    server.stop()
+    backend = app.create_cache_backend(url)
+    assert backend.get('k') is None
+    assert backend.incr('k', ttl=60) is None
+
+@pytest.fixture(scope='module')
+def certificate(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('tls')
+    cert, key = directory / 'cert.pem', directory / 'key.pem'
+    try:
+        subprocess.run(
+            ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+             '-subj', '/CN=localhost', '-addext', 'subjectAltName=DNS:localhost',
+             '-keyout', str(key), '-out', str(cert)],
+            check=True, capture_output=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        pytest.skip('openssl is needed to generate a test certificate')
+    return str(cert), str(key)
+
+@pytest.fixture
+def tls_server(certificate):
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(*certificate)
+    server = FakeRedisServer(password='s3cret', ssl_context=context).start()
+    yield server
+    server.stop()
+
+def test_rediss_connects_over_tls(tls_server, certificate):
+    client_context = ssl.create_default_context(cafile=certificate[0])
+    backend = app.RedisCacheBackend(tls_server.url(), ssl_context=client_context)
+    backend.set('k', {"secure": True}, ttl=60)
+    assert backend.get('k') == {"secure": True}
+    assert isinstance(backend._local.sock, ssl.SSLSocket)
+
+def test_rediss_verifies_the_server_certificate(tls_server):
+    # The default context doesn't trust the self-signed test certificate
+    backend = app.create_cache_backend(tls_server.url())
+    assert backend.ssl_context is not None
+    assert backend.get('k') is None
+    assert tls_server.commands == []
+
+def test_plain_redis_does_not_use_tls(redis_server):
+    assert app.create_cache_backend(redis_server.url()).ssl_context is None
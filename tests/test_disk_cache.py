@@ -0,0 +1,37 @@
+import sqlite3
+import zlib
+
+import pytest
+
+import app
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    return app.DiskCache(str(tmp_path / 'scrape.db'), stale_ttl=60)
+
+def corrupt(cache, key, value):
+    conn = sqlite3.connect(cache.path)
+    conn.execute('UPDATE entries SET value = ? WHERE key = ?', (value, key))
+    conn.commit()
+    conn.close()
+
+def test_round_trip(disk_cache):
+    disk_cache.store('k', [{"source": "NHS"}], ttl=30)
+    value, remaining = disk_cache.load('k')
+    assert value == [{"source": "NHS"}]
+    assert 0 < remaining <= 30
+    assert disk_cache.load('other') == (None, 0)
+    assert (disk_cache.hits, disk_cache.misses) == (1, 1)
+
+@pytest.mark.parametrize('bad_value', [
+    b'not zlib at all',
+    zlib.compress(b'{"truncated": '),
+    zlib.compress(b'\xff\xfe'),
+])
+def test_unreadable_row_is_a_miss_and_removed(disk_cache, bad_value):
+    disk_cache.store('k', [{"source": "NHS"}], ttl=30)
+    corrupt(disk_cache, 'k', bad_value)
+    assert disk_cache.load('k') == (None, 0)
+    assert disk_cache.stats()["corrupt"] == 1
+    count = sqlite3.connect(disk_cache.path).execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+    assert count == 0
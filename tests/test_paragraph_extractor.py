@@ -0,0 +1,33 @@
+import pytest
+import requests
+
+import app
+
+PARAGRAPH = 'Café au lait spots are flat patches of skin darker than the skin around them.'
+
+def response_with(content_type, body):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = content_type
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response._content = body
+    return response
+
+def test_declared_charset_decodes_the_page():
+    response = response_with('text/html; charset=utf-8', f'<p>{PARAGRAPH}</p>'.encode('utf-8'))
+    assert app.DEFAULT_EXTRACTOR.extract(response.content, app.declared_charset(response)) == [PARAGRAPH]
+
+def test_meta_charset_is_used_when_the_header_has_none():
+    body = f'<html><head><meta charset="utf-8"></head><body><p>{PARAGRAPH}</p></body></html>'.encode('utf-8')
+    response = response_with('text/html', body)
+    assert app.declared_charset(response) is None
+    assert app.DEFAULT_EXTRACTOR.extract(response.content, app.declared_charset(response)) == [PARAGRAPH]
+
+@pytest.mark.parametrize('content_type, expected', [
+    ('text/html; charset=UTF-8', 'utf-8'),
+    ('text/html; charset=windows-1252', 'cp1252'),
+    ('text/html', None),
+    ('text/html; charset=no-such-charset', None),
+])
+def test_declared_charset(content_type, expected):
+    assert app.declared_charset(response_with(content_type, b'')) == expected
@@ -0,0 +1,58 @@
+from concurrent.futures import Future
+
+import app
+
+class BusyScheduler:
+    """Drops every fetch, as HostScheduler does when a host's backlog is full"""
+
+    def submit(self, host, fn, *args):
+        future = Future()
+        future.set_exception(app.HostBusy(host))
+        return future
+
+def open_breaker(health):
+    for _ in range(health.failure_threshold):
+        health.record_failure()
+    assert health.state == health.OPEN
+
+def test_dropped_probe_reopens_the_circuit(monkeypatch):
+    monkeypatch.setattr(app, 'host_scheduler', BusyScheduler())
+    monkeypatch.setattr(app, '_source_health', {})
+    source_name = next(iter(app.MEDICAL_SOURCES))
+    health = app.source_health(source_name)
+    health.cooldown = 0
+    open_breaker(health)
+
+    job = app._launch_scrape('dropped probe test', 'dropped-probe-test', 1)
+    job.wait(1)
+
+    assert health.state == health.OPEN
+    # The next request after the cooldown gets to probe again
+    assert health.allow_request() is True
+    assert health.state == health.HALF_OPEN
+
+def test_release_probe_leaves_a_closed_circuit_alone():
+    health = app.SourceHealth('test')
+    health.release_probe()
+    assert health.state == health.CLOSED
+
+def test_probe_gets_the_full_timeout():
+    health = app.SourceHealth('test', cooldown=0, max_timeout=5)
+    for _ in range(app.LATENCY_MIN_SAMPLES):
+        health.record_success(0.1)
+    assert health.timeout() == app.ADAPTIVE_TIMEOUT_MIN
+    open_breaker(health)
+    assert health.allow_request() is True
+    assert health.timeout() == 5
+
+def test_timeouts_widen_the_budget_again():
+    health = app.SourceHealth('test', failure_threshold=1000, max_timeout=5)
+    for _ in range(app.LATENCY_MIN_SAMPLES):
+        health.record_success(0.2)
+    assert health.timeout() == app.ADAPTIVE_TIMEOUT_MIN
+    # The source now takes 1.5s, so every request runs out the 1s budget
+    for _ in range(app.LATENCY_MIN_SAMPLES):
+        health.record_failure(timed_out_after=health.timeout())
+    assert health.timeout() > app.ADAPTIVE_TIMEOUT_MIN
+    health.record_success(1.5)
+    assert health.timeout() >= 1.5
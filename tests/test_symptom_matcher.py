@@ -0,0 +1,71 @@
+import pytest
+
+import app
+
+@pytest.fixture(scope='module')
+def matcher():
+    return app.knowledge_store.current.matcher
+
+def match(matcher, text):
+    return matcher.match(app.sanitize_input(text))
+
+@pytest.mark.parametrize('text', [
+    "I was cooking dinner",
+    "my dog had a strike",
+    "I never get headaches but today is different",
+    "rough day, tough week",
+    "packing my bags",
+    "I locked the door",
+    "a fizzy drink",
+])
+def test_ordinary_words_are_not_corrected_into_symptoms(matcher, text):
+    symptoms, emergency = match(matcher, text)
+    assert emergency is False
+    assert 'fever' not in symptoms
+    assert 'cough' not in symptoms
+    assert 'constipation' not in symptoms
+    assert 'dizziness' not in symptoms
+
+def test_never_is_not_fever(matcher):
+    assert match(matcher, "I never get headaches") == (['headache'], False)
+
+@pytest.mark.parametrize('word', ['conclusion', 'contusion', 'seating', 'respiration', 'timed', 'tiled', 'whacking'])
+def test_real_words_are_never_corrected(matcher, word):
+    assert match(matcher, f"I noticed {word} today") == ([], False)
+
+def test_real_word_next_to_an_emergency_symptom_leaves_the_flag_alone(matcher):
+    result = app.analyze_locally(app.sanitize_input("In conclusion, I have a headache"), app.knowledge_store.current)
+    assert result['detected_symptoms'] == ['headache']
+    assert result['emergency_flag'] is False
+    assert result['conditions_ranked'][0]['name'] != 'Stroke'
+
+@pytest.mark.parametrize('text', ["chokng on food", "had a strok", "stroek", "chest pian"])
+def test_typos_never_raise_the_emergency_flag(matcher, text):
+    assert match(matcher, text)[1] is False
+
+def test_emergency_keywords_still_match_as_typed(matcher):
+    assert match(matcher, "I think he had a stroke")[1] is True
+    assert match(matcher, "sudden chest pain")[1] is True
+
+@pytest.mark.parametrize('text, expected', [
+    ("I have a headach", ['headache']),
+    ("diarhea since yesterday", ['diarrhea']),
+])
+def test_symptom_typos_are_corrected(matcher, text, expected):
+    assert match(matcher, text)[0] == expected
+
+@pytest.mark.parametrize('text', ["feeling nausious", "very confsed", "sweatng a lot"])
+def test_typos_are_never_corrected_into_emergency_condition_symptoms(matcher, text):
+    assert match(matcher, text) == ([], False)
+
+@pytest.mark.parametrize('text', ["I went for a run", "I spot a bird"])
+def test_synonyms_are_not_folded_into_singulars(matcher, text):
+    assert match(matcher, text) == ([], False)
+
+@pytest.mark.parametrize('text, expected', [
+    ("terrible headaches", ['headache']),
+    ("I have the runs", ['diarrhea']),
+    ("red spots on my arm", ['rash']),
+])
+def test_plurals_fold_onto_vocabulary(matcher, text, expected):
+    assert match(matcher, text)[0] == expected